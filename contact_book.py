@@ -1,8 +1,19 @@
+from __future__ import annotations
+
+import array
+import bisect
 import datetime
 import os
 import pathlib
 import json
-import pickle
+import re
+import zlib
+import contextlib
+import functools
+import io
+import itertools
+import struct
+import time
 
 
 def get_tuning_value(tuning_name: str):
@@ -15,7 +26,26 @@ def get_tuning_value(tuning_name: str):
                                path_to_dbase=os.path.expanduser('~'),
                                path_to_dir='contact_book',
                                name_log='contact-book.log',
-                               file_name_of_backup='contact_book_backup'
+                               log_level='INFO',  # DEBUG (arguments and results of functions), INFO, WARNING, ERROR
+                               log_batch_size=1024,  # records, which are written to log at once
+                               log_sample_every=1,  # functions calls: only every N call is logged
+                               server_port=8765,  # localhost TCP port of server of contact book
+                               storage_engine='text',  # 'text' (file dbase in memory) or 'sqlite'
+                               import_mark_print=100_000,  # rows of import between messages of progress
+                               metrics_enabled=False,  # counters and latency histograms (MetricsRegistry)
+                               metrics_file=None,  # metrics are written at exit: *.json or Prometheus text
+                               file_name_of_backup='contact_book_backup',
+                               chunk_size=1 << 20,
+                               contact_store='dict',  # 'dict' or 'columnar' (ContactStore)
+                               journal_max_size=4 << 20,  # bytes, bigger journal is folded into file dbase
+                               durability='always',  # fsync of saves and journal: 'always', 'batch' or 'none'
+                               fsync_batch=16,  # for durability 'batch': fsync on every fsync_batch write
+                               backup_batch_size=10_000,
+                               backup_chain_max_deltas=16,  # after this count of deltas new full backup is made
+                               backup_compress_levels=dict(gz=6, bz2=9, xz=6),
+                               format_of_compressed_backup='ndjson.gz',
+                               download_workers=1,  # processes for parsing of file dbase, 1 - without pool
+                               dbase_snapshot=True,  # sidecar <file dbase>.snapshot with contacts and indexes
                              )
 
     if tuning_name == 'path_to_dbase':
@@ -112,6 +142,28 @@ class ContactExistInFileDBase(ExceptionContactBook):
     pass
 
 
+class FileBaseCorrupted(ExceptionContactBook):
+    __message = {
+        'ru': '',
+        'en': 'File of contact book is corrupted (checksum failed)',
+    }
+
+    @classmethod
+    def message(cls, lang='en'):
+        return FileBaseCorrupted.__message.get(lang.lower())
+
+
+class VersionConflict(ExceptionContactBook):
+    __message = {
+        'ru': '',
+        'en': 'File of contact book was changed by other process',
+    }
+
+    @classmethod
+    def message(cls, lang='en'):
+        return VersionConflict.__message.get(lang.lower())
+
+
 class Contact:
     __count_objects = 0
     __mask_date_time_creation = '%d.%m.%Y %H:%M:%S'
@@ -181,9 +233,12 @@ class Contact:
     def __init__(self,
                  phone_number: str,
                  contact_name: str,
-                 date_time_creation_contact=datetime.datetime.now(),
+                 date_time_creation_contact: datetime.datetime = None,
                  validate: bool=True):
 
+        if date_time_creation_contact is None:
+            date_time_creation_contact = datetime.datetime.now()
+
         if validate:
             Contact.validate_contact_name(contact_name=contact_name)
             Contact.validate_phone_number(phone_number=phone_number)
@@ -205,6 +260,10 @@ class Contact:
     def __eq__(self, other):
         return self.phone_number == other.phone_number
 
+    def __reduce__(self):
+        # unpickling goes through __init__, so count of objects is right
+        return self.__class__, (self.__phone_number, self.__contact_name, self.__date_time_creation_contact, False)
+
     @property
     def contact_name(self):
         return self.__contact_name
@@ -292,27 +351,553 @@ class ContactMs(Contact):
                          )
 
 
+class ValidationReport:
+    """Result of batch validation: indexes of valid rows and indexes of invalid rows by reason"""
+
+    __slots__ = ('cnt_rows',
+                 'valid',
+                 'invalid',
+                 )
+
+    def __init__(self):
+        self.cnt_rows = 0
+        self.valid = array.array('L')
+        self.invalid: dict = {}  # reason -> array of indexes
+
+    @property
+    def cnt_invalid(self) -> int:
+        return sum(len(indexes) for indexes in self.invalid.values())
+
+    def rows_invalid(self) -> list:
+        """[(index of row, reason), ...] in order of rows"""
+        return sorted((index, reason) for reason, indexes in self.invalid.items() for index in indexes)
+
+    def summary(self) -> str:
+        return ', '.join(f'{reason}: {len(indexes)}' for reason, indexes in self.invalid.items())
+
+
+def validate_contacts(rows, start_index: int = 0) -> ValidationReport:
+    """batch validation of (phone number, contact name) without exceptions and printing on every row.
+    Rules are the same as Contact.validate_phone_number/validate_contact_name,
+    and contact name can't have separator of file dbase or end of line"""
+    match_phone = re.compile(r'\+?[0-9]*').fullmatch
+    bad_name = re.compile(f'[{re.escape(get_tuning_value("sep_in_dbase"))}\r\n]').search
+
+    report = ValidationReport()
+    valid_append = report.valid.append
+    invalid = report.invalid
+    index = start_index - 1
+
+    for index, (phone_number, contact_name) in enumerate(rows, start_index):
+        if not (isinstance(phone_number, str) and isinstance(contact_name, str)):
+            reason = 'not_str'
+        elif not phone_number:
+            reason = 'phone_empty'
+        elif match_phone(phone_number) is None:
+            reason = 'phone_not_digits'
+        elif not contact_name:
+            reason = 'name_empty'
+        elif bad_name(contact_name) is not None:
+            reason = 'name_has_separator'
+        else:
+            valid_append(index)
+            continue
+
+        indexes = invalid.get(reason)
+        if indexes is None:
+            indexes = invalid[reason] = array.array('L')
+        indexes.append(index)
+
+    report.cnt_rows = index + 1 - start_index
+    return report
+
+
+class ContactStore:
+    """Compact columnar storage of contacts with interface of dict (phone number -> Contact).
+    Phone numbers and names are packed in byte buffers, date and time of creation is kept
+    in seconds (array 'q'), phone number -> row is open addressing hash table (array 'i').
+    Objects Contact are created on demand only."""
+
+    __epoch = datetime.datetime(1970, 1, 1)
+
+    __slots__ = ('__phones',
+                 '__phones_start',
+                 '__phones_len',
+                 '__names',
+                 '__names_start',
+                 '__names_len',
+                 '__seconds',
+                 '__deleted',
+                 '__table',
+                 '__cnt_slots',
+                 '__cnt_live',
+                 )
+
+    @classmethod
+    def seconds(cls, date_time: datetime.datetime) -> int:
+        return (date_time - cls.__epoch) // datetime.timedelta(seconds=1)
+
+    @classmethod
+    def date_time(cls, seconds: int) -> datetime.datetime:
+        return cls.__epoch + datetime.timedelta(seconds=seconds)
+
+    def __init__(self, dict_contacts: dict = None):
+        # offsets are 32 bit (buffers up to 4 Gb), lengths of phone and name up to 255 and 65535 bytes
+        self.__phones = bytearray()
+        self.__phones_start = array.array('I')
+        self.__phones_len = array.array('B')
+        self.__names = bytearray()
+        self.__names_start = array.array('I')
+        self.__names_len = array.array('H')
+        self.__seconds = array.array('q')
+        self.__deleted = bytearray()
+        self.__table = array.array('i', [-1]) * 8
+        self.__cnt_slots = 0  # used slots of hash table (with deleted rows)
+        self.__cnt_live = 0
+
+        if dict_contacts:
+            for contact in dict_contacts.values():
+                self[contact.phone_number] = contact
+
+    def __len__(self):
+        return self.__cnt_live
+
+    def __phone_bytes(self, row: int) -> bytes:
+        start = self.__phones_start[row]
+        return bytes(self.__phones[start:start + self.__phones_len[row]])
+
+    def __name(self, row: int) -> str:
+        start = self.__names_start[row]
+        return self.__names[start:start + self.__names_len[row]].decode()
+
+    def __find_row(self, phone_number: bytes) -> tuple:
+        """row of phone number (-1 if not found) and slot of hash table for it"""
+        table = self.__table
+        mask = len(table) - 1
+        slot = hash(phone_number) & mask
+        while True:
+            row = table[slot]
+            if row == -1:
+                return -1, slot
+            if not self.__deleted[row] and self.__phone_bytes(row) == phone_number:
+                return row, slot
+            slot = (slot + 1) & mask
+
+    def __rehash(self) -> None:
+        size = len(self.__table)
+        while size < 4 * (self.__cnt_live + 1):
+            size *= 2
+
+        table = array.array('i', [-1]) * size
+        mask = size - 1
+        for row in range(len(self.__seconds)):
+            if self.__deleted[row]:
+                continue
+            slot = hash(self.__phone_bytes(row)) & mask
+            while table[slot] != -1:
+                slot = (slot + 1) & mask
+            table[slot] = row
+
+        self.__table = table
+        self.__cnt_slots = self.__cnt_live
+
+    def row(self, phone_number: str) -> int:
+        """row of contact in store (-1 if not found)"""
+        return self.__find_row(phone_number.encode())[0]
+
+    def put_record(self,
+                   phone_number: str,
+                   contact_name: str,
+                   seconds: int) -> None:
+        """add or update contact without creation of object Contact"""
+        phone_bytes = phone_number.encode()
+        name_bytes = contact_name.encode()
+        row, slot = self.__find_row(phone_bytes)
+
+        if row >= 0:
+            if len(name_bytes) <= self.__names_len[row]:
+                start = self.__names_start[row]
+                self.__names[start:start + self.__names_len[row]] = name_bytes
+            else:
+                self.__names_start[row] = len(self.__names)
+                self.__names += name_bytes
+            self.__names_len[row] = len(name_bytes)
+            self.__seconds[row] = seconds
+            return
+
+        row = len(self.__seconds)
+        self.__phones_start.append(len(self.__phones))
+        self.__phones_len.append(len(phone_bytes))
+        self.__phones += phone_bytes
+        self.__names_start.append(len(self.__names))
+        self.__names_len.append(len(name_bytes))
+        self.__names += name_bytes
+        self.__seconds.append(seconds)
+        self.__deleted.append(0)
+        self.__table[slot] = row
+        self.__cnt_slots += 1
+        self.__cnt_live += 1
+
+        # deleted rows stay in hash table until rehash
+        if 2 * self.__cnt_slots > len(self.__table):
+            self.__rehash()
+
+    def contact(self, row: int) -> Contact:
+        return Contact(phone_number=self.__phone_bytes(row).decode(),
+                       contact_name=self.__name(row),
+                       date_time_creation_contact=self.date_time(self.__seconds[row]),
+                       validate=False)
+
+    def __setitem__(self, phone_number: str, contact: Contact):
+        self.put_record(phone_number=phone_number,
+                        contact_name=contact.contact_name,
+                        seconds=self.seconds(contact.date_time_creation_contact))
+
+    def __getitem__(self, phone_number: str) -> Contact:
+        row = self.row(phone_number)
+        if row < 0:
+            raise KeyError(phone_number)
+        return self.contact(row)
+
+    def __delitem__(self, phone_number: str):
+        row = self.row(phone_number)
+        if row < 0:
+            raise KeyError(phone_number)
+        self.__deleted[row] = 1
+        self.__cnt_live -= 1
+
+    def __contains__(self, phone_number: str) -> bool:
+        return self.row(phone_number) >= 0
+
+    def get(self, phone_number: str, default=None):
+        row = self.row(phone_number)
+        return default if row < 0 else self.contact(row)
+
+    def __rows(self):
+        deleted = self.__deleted
+        return (row for row in range(len(self.__seconds)) if not deleted[row])
+
+    def __iter__(self):
+        return (self.__phone_bytes(row).decode() for row in self.__rows())
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (self.contact(row) for row in self.__rows())
+
+    def items(self):
+        return ((contact.phone_number, contact) for contact in self.values())
+
+    def compact(self) -> None:
+        """drop deleted rows and unused bytes of names"""
+        store = ContactStore()
+        for row in self.__rows():
+            store.put_record(phone_number=self.__phone_bytes(row).decode(),
+                             contact_name=self.__name(row),
+                             seconds=self.__seconds[row])
+
+        for name in ContactStore.__slots__:
+            name = f'_ContactStore{name}'
+            setattr(self, name, getattr(store, name))
+
+
+eq_sym_table: dict = str.maketrans({'ё': 'е',
+                                    't': 'т',
+                                    'e': 'е',
+                                    'k': 'к',
+                                    'a': 'а',
+                                    'm': 'м',
+                                    'b': 'в',
+                                    'c': 'с',
+                                    'h': 'н',
+                                    'p': 'р',
+                                    'o': 'о'})
+
+
+def normalize_name(contact_name: str) -> str:
+    """key for search: lower case, latin symbols replaced by the same cyrillic symbols"""
+    return contact_name.lower().translate(eq_sym_table)
+
+
+def normalize_names(names: list) -> list:
+    """normalize_name for many names by one call of lower and translate (for bulk load)"""
+    if not names:
+        return []
+    return '\n'.join(names).lower().translate(eq_sym_table).split('\n')
+
+
 def get_eq(val1: str, val2: str):
     """case-insensitive search"""
-    result = val1.lower() == val2.lower()
+    return val1.lower() == val2.lower() or normalize_name(val1) == normalize_name(val2)
+
+
+class SortedIndex:
+    """Sorted array of keys for search contacts by prefix of key (bisect).
+    The key of contact is defined in subclass (method key)"""
+
+    __slots__ = ('__keys',
+                 '__phones',
+                 )
+
+    @classmethod
+    def key(cls, contact: Contact) -> str:
+        raise NotImplementedError
+
+    @classmethod
+    def keys_of_contacts(cls, contacts) -> tuple:
+        """keys and phone numbers of contacts (two lists)"""
+        keys, phones = [], []
+        for contact in contacts:
+            keys.append(cls.key(contact))
+            phones.append(contact.phone_number)
+        return keys, phones
+
+    def __init__(self, dict_contacts: dict = None):
+        keys, phones = self.keys_of_contacts(dict_contacts.values() if dict_contacts else ())
+
+        # sort positions instead of pairs (key, phone): it needs less memory for big contact book
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+
+        self.__keys = [keys[i] for i in order]
+        self.__phones = [phones[i] for i in order]
+
+    def __len__(self):
+        return len(self.__keys)
+
+    def add(self, contact: Contact) -> None:
+        key = self.key(contact)
+        i = bisect.bisect_right(self.__keys, key)
+        self.__keys.insert(i, key)
+        self.__phones.insert(i, contact.phone_number)
+
+    def add_batch(self, contacts: list) -> None:
+        """add many contacts at once: new keys are appended and all keys are sorted again
+        (sort of two sorted runs is linear), instead of insert for every contact"""
+        keys, phones = self.keys_of_contacts(contacts)
+        keys = self.__keys + keys
+        phones = self.__phones + phones
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.__keys = [keys[i] for i in order]
+        self.__phones = [phones[i] for i in order]
+
+    def remove(self, contact: Contact) -> None:
+        key = self.key(contact)
+        for i in range(bisect.bisect_left(self.__keys, key), bisect.bisect_right(self.__keys, key)):
+            if self.__phones[i] == contact.phone_number:
+                del self.__keys[i]
+                del self.__phones[i]
+                break
+
+    def bounds(self, prefix: str) -> tuple:
+        """positions of first and after last key with prefix"""
+        return (bisect.bisect_left(self.__keys, prefix),
+                bisect.bisect_left(self.__keys, prefix + chr(0x10FFFF)))
+
+    def find(self, prefix: str) -> list:
+        """phone numbers of contacts with key started on prefix"""
+        lo, hi = self.bounds(prefix)
+        return self.__phones[lo:hi]
+
+    def find_range(self, start: str, stop: str) -> list:
+        """phone numbers of contacts with key in range [start, stop)"""
+        return self.__phones[bisect.bisect_left(self.__keys, start):bisect.bisect_left(self.__keys, stop)]
+
+    def position(self, key: str) -> int:
+        """position of first key >= key"""
+        return bisect.bisect_left(self.__keys, key)
+
+    def phones_at(self, start: int, stop: int) -> list:
+        """phone numbers of contacts on positions [start, stop) in order of keys"""
+        return self.__phones[start:stop]
+
+
+class NamesIndex(SortedIndex):
+    """index for search contacts by prefix of contact name"""
+
+    __slots__ = ()
+
+    @classmethod
+    def key(cls, contact: Contact) -> str:
+        return normalize_name(contact.contact_name)
+
+    @classmethod
+    def keys_of_contacts(cls, contacts) -> tuple:
+        names, phones = [], []
+        for contact in contacts:
+            names.append(contact.contact_name)
+            phones.append(contact.phone_number)
+        return normalize_names(names), phones
+
+    def find(self, prefix: str) -> list:
+        return super().find(normalize_name(prefix))
+
+    def position(self, key: str) -> int:
+        return super().position(normalize_name(key))
+
+
+class OrderIndex(SortedIndex):
+    """contacts in order of contact names, as they are shown to user (pages of print_contacts)"""
+
+    __slots__ = ()
+
+    @classmethod
+    def key(cls, contact: Contact) -> str:
+        return contact.contact_name
+
+
+def normalize_phone(phone_number: str) -> str:
+    """key for search by phone number: phone number without leading plus"""
+    return phone_number[1:] if phone_number.startswith('+') else phone_number
+
+
+class PhoneIndex(SortedIndex):
+    """index for search contacts by prefix or range of phone number"""
+
+    __slots__ = ()
+
+    @classmethod
+    def key(cls, contact: Contact) -> str:
+        return normalize_phone(contact.phone_number)
+
+    def find(self, prefix: str) -> list:
+        return super().find(normalize_phone(prefix))
+
+    def find_range(self, start: str, stop: str) -> list:
+        return super().find_range(normalize_phone(start), normalize_phone(stop))
+
 
-    if not result:
-        eq_sym = {'ё': 'е',
-                  't': 'т',
-                  'e': 'е',
-                  'k': 'к',
-                  'a': 'а',
-                  'm': 'м',
-                  'b': 'в',
-                  'c': 'с',
-                  'h': 'н',
-                  'p': 'р',
-                  'o': 'о'}
+class InfixIndex:
+    """Trigram index for search contacts by part of contact name (name contains fragment).
+    Contacts are rows (numbers in order of adding), posting of trigram is array of rows ('I', 4 bytes
+    for contact in trigram), so index is few times smaller then sets of phone numbers.
+    Removed row is only marked (phone None) and it is skipped by search, posting is compacted
+    when removed rows are more then alive"""
 
-        if ''.join([eq_sym.get(i, i) for i in val1.lower()]) == ''.join([eq_sym.get(i, i) for i in val2.lower()]):
-            result = True
+    __slots__ = ('__grams',
+                 '__short',
+                 '__rows',
+                 '__phones',
+                 '__keys',
+                 )
+
+    @classmethod
+    def key(cls, contact: Contact) -> str:
+        return normalize_name(contact.contact_name)
 
-    return result
+    @classmethod
+    def trigrams(cls, key: str) -> set:
+        return {key[i:i + 3] for i in range(len(key) - 2)}
+
+    def __init__(self, dict_contacts: dict = None):
+        self.__grams: dict = {}  # trigram -> array of rows
+        self.__short = array.array('I')  # rows of contacts with name shorter then trigram
+        self.__rows: dict = {}  # phone number -> row
+        self.__phones: list = []  # row -> phone number (None - removed)
+        self.__keys: list = []  # row -> key
+
+        if dict_contacts:
+            keys, phones = NamesIndex.keys_of_contacts(dict_contacts.values())
+            self.__add_keys(phones=phones, keys=keys)
+
+    def __len__(self):
+        return len(self.__rows)
+
+    def add(self, contact: Contact) -> None:
+        self.add_batch((contact,))
+
+    def add_batch(self, contacts) -> None:
+        for contact in contacts:
+            if contact.phone_number in self.__rows:
+                self.remove(contact)
+
+        keys, phones = NamesIndex.keys_of_contacts(contacts)
+        self.__add_keys(phones=phones, keys=keys)
+
+    def __add_keys(self, phones, keys) -> None:
+        rows = self.__rows
+        grams = self.__grams
+        trigrams = self.trigrams
+        row = len(self.__phones)
+
+        for phone_number, key in zip(phones, keys):
+            rows[phone_number] = row
+
+            if len(key) < 3:
+                self.__short.append(row)
+
+            for gram in trigrams(key):
+                posting = grams.get(gram)
+                if posting is None:
+                    grams[gram] = array.array('I', (row,))
+                else:
+                    posting.append(row)
+            row += 1
+
+        self.__phones.extend(phones)
+        self.__keys.extend(keys)
+
+    def remove(self, contact: Contact) -> None:
+        row = self.__rows.pop(contact.phone_number, None)
+        if row is None:
+            return
+
+        self.__phones[row] = None
+        self.__keys[row] = ''
+
+        if len(self.__phones) > max(2 * len(self.__rows), 1024):
+            self.__compact()
+
+    def __compact(self) -> None:
+        alive = [(phone_number, key) for phone_number, key in zip(self.__phones, self.__keys)
+                 if phone_number is not None]
+        self.__init__()
+        if alive:
+            phones, keys = zip(*alive)
+            self.__add_keys(phones=list(phones), keys=list(keys))
+
+    def __candidates(self, fragment: str):
+        """rows, which can have fragment (removed rows are skipped, key is checked by find)"""
+        phones = self.__phones
+        if len(fragment) >= 3:
+            # every row with fragment is in posting of every its trigram, the shortest is enough
+            postings = []
+            for gram in self.trigrams(fragment):
+                posting = self.__grams.get(gram)
+                if posting is None:
+                    return
+                postings.append(posting)
+
+            for row in min(postings, key=len):
+                if phones[row] is not None:
+                    yield row
+        else:
+            # short fragment: every name with it has trigram with it (or is short itself)
+            seen = set()
+            for gram, posting in self.__grams.items():
+                if fragment in gram:
+                    for row in posting:
+                        if row not in seen and phones[row] is not None:
+                            seen.add(row)
+                            yield row
+            yield from (row for row in self.__short if row not in seen and phones[row] is not None)
+
+    def find(self, fragment: str, limit: int = None):
+        """generator of phone numbers of contacts with name contains fragment"""
+        fragment = normalize_name(fragment)
+        if limit is not None and limit <= 0:
+            return
+
+        keys = self.__keys
+        phones = self.__phones
+        cnt = 0
+        for row in self.__candidates(fragment):
+            if fragment in keys[row]:
+                yield phones[row]
+                cnt += 1
+                if cnt == limit:
+                    return
 
 
 def sorted_dict_contacts(dict_contacts: dict) -> list:
@@ -327,22 +912,152 @@ def obj2json(obj):
         return str(obj)
 
 
+class BufferedLog:
+    """Log of contact book: records are put to queue and written by background thread
+    (one open file, records are written and flushed by batches). File and thread are created
+    on first record. Levels: DEBUG, INFO, WARNING, ERROR (tuning log_level)"""
+
+    levels = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+    __log_of_application = None
+
+    @classmethod
+    def get(cls) -> 'BufferedLog':
+        """log of application (it is created on first call)"""
+        if cls.__log_of_application is None:
+            cls.__log_of_application = cls()
+        return cls.__log_of_application
+
+    def __init__(self, path_to_file_log=None, level: str = None, batch_size: int = None):
+        self.__path_to_file_log = path_to_file_log
+        self.__level = self.levels[(level or get_tuning_value('log_level')).upper()]
+        self.__batch_size = batch_size or get_tuning_value('log_batch_size')
+        self.__queue = None
+        self.__thread = None
+
+    @property
+    def level(self) -> int:
+        return self.__level
+
+    def set_level(self, level: str) -> None:
+        self.__level = self.levels[level.upper()]
+
+    def enabled_for(self, level: int) -> bool:
+        return level >= self.__level
+
+    def __start(self) -> None:
+        import atexit
+        import queue
+        import threading
+
+        if self.__path_to_file_log is None:
+            self.__path_to_file_log = pathlib.Path(get_tuning_value('path_to_dbase')
+                                                   + os.sep + get_tuning_value('name_log'))
+        try:
+            file_log = open(self.__path_to_file_log, 'a')
+        except OSError:
+            raise FileLogNotCreated
+
+        self.__queue = queue.SimpleQueue()
+        self.__thread = threading.Thread(target=self.__write, args=(file_log,), name='log', daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    def __write(self, file_log) -> None:
+        import queue
+
+        names_of_levels = {value: name for name, value in self.levels.items()}
+        get = self.__queue.get
+        get_nowait = self.__queue.get_nowait
+
+        with file_log:
+            while True:
+                batch = [get()]
+                with contextlib.suppress(queue.Empty):
+                    while len(batch) < self.__batch_size:
+                        batch.append(get_nowait())
+
+                lines = []
+                stop = False
+                for rec in batch:
+                    if rec is None:
+                        stop = True
+                    elif isinstance(rec, tuple):
+                        time_ns, level, message = rec
+                        time_log = datetime.datetime.fromtimestamp(time_ns // 1_000_000_000)
+                        lines.append(f'{time_log.strftime(Contact.mask_date_time_creation())}'
+                                     f'.{time_ns % 1_000_000_000 // 1000:06d} '
+                                     f'{names_of_levels[level]} {message}\n')
+                    else:
+                        file_log.write(''.join(lines))
+                        lines.clear()
+                        file_log.flush()
+                        rec.set()  # flush() is waiting for it
+
+                file_log.write(''.join(lines))
+                file_log.flush()
+                if stop:
+                    return
+
+    def log(self, level: int, message: str) -> None:
+        if level < self.__level:
+            return
+        if self.__thread is None:
+            self.__start()
+        self.__queue.put((time.time_ns(), level, message))
+
+    def debug(self, message: str) -> None:
+        self.log(self.levels['DEBUG'], message)
+
+    def info(self, message: str) -> None:
+        self.log(self.levels['INFO'], message)
+
+    def flush(self) -> None:
+        """wait up to all records are written to file"""
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        import threading
+        written = threading.Event()
+        self.__queue.put(written)
+        written.wait()
+
+    def close(self) -> None:
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        self.__queue.put(None)
+        self.__thread.join()
+
+
+def get_repr(obj) -> str:
+    """short representation of argument for log (big dict of contacts isn't written entirely)"""
+    if hasattr(obj, '__len__') and not isinstance(obj, str) and len(obj) > 8:
+        return f'<{type(obj).__name__} of {len(obj)} items>'
+
+    import reprlib
+    return reprlib.repr(obj)
+
+
 def decorator_time_lost(func):
+    """log time of execution of function (ns, perf_counter), every log_sample_every call is logged"""
+    sample_every = 0
+    cnt_calls = 0
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        path_to_file_log = pathlib.Path(get_tuning_value('path_to_dbase') + os.sep + get_tuning_value('name_log'))
-        try:
-            if not pathlib.Path(path_to_file_log).exists():
-                raise FileLogNotFound
-        except FileLogNotFound:
-            if not create_file_log(path_to_file_log=path_to_file_log):
-                raise FileLogNotCreated
-
-        with open(path_to_file_log, 'a') as fl:
-            fl.write(f'start function: {func.__name__}'
-                     f'{datetime.datetime.now().strftime(Contact.mask_date_time_creation())}\n')
-            ret = func(*args, **kwargs)
-            fl.write(f'stop function {func.__name__}'
-                     f'{datetime.datetime.now().strftime(Contact.mask_date_time_creation())}\n')
+        nonlocal sample_every, cnt_calls
+        log = BufferedLog.get()
+        if not log.enabled_for(BufferedLog.levels['INFO']):
+            return func(*args, **kwargs)
+
+        if not sample_every:
+            sample_every = get_tuning_value('log_sample_every')
+        cnt_calls += 1
+        if cnt_calls % sample_every:
+            return func(*args, **kwargs)
+
+        time_start = time.perf_counter_ns()
+        ret = func(*args, **kwargs)
+        log.info(f'function {func.__name__}: {time.perf_counter_ns() - time_start} ns')
 
         return ret
 
@@ -350,37 +1065,155 @@ def decorator_time_lost(func):
 
 
 def decorator_args_kwargs(func):
-    def wrapper(*args, **kwargs):
-        path_to_file_log = pathlib.Path(get_tuning_value('path_to_dbase') + os.sep + get_tuning_value('name_log'))
+    """log arguments and result of function (level DEBUG), every log_sample_every call is logged"""
+    sample_every = 0
+    cnt_calls = 0
 
-        if path_to_file_log is not None:
-            try:
-                if not pathlib.Path(path_to_file_log).exists():
-                    raise FileLogNotFound
-            except FileLogNotFound:
-                if not create_file_log(path_to_file_log=path_to_file_log):
-                    raise FileLogNotCreated
-
-            with open(path_to_file_log, 'a') as fl:
-                sep = get_tuning_value('sep_in_dbase')
-                fl.write(f'args: {sep.join(list(args))}\n')
-
-                list_kwargs = [str(i) + ':' + str(j) for i, j in kwargs.items()]
-                fl.write(f'kwargs: {sep.join(list_kwargs)}\n')
-        else:
-            print(*args, sep='\n')
-            print(*kwargs, sep='\n')
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal sample_every, cnt_calls
+        log = BufferedLog.get()
+        if not log.enabled_for(BufferedLog.levels['DEBUG']):
+            return func(*args, **kwargs)
+
+        if not sample_every:
+            sample_every = get_tuning_value('log_sample_every')
+        cnt_calls += 1
+        if cnt_calls % sample_every:
+            return func(*args, **kwargs)
+
+        sep = get_tuning_value('sep_in_dbase')
+        log.debug(f'function {func.__name__} args: {sep.join(get_repr(i) for i in args)}; '
+                  f'kwargs: {sep.join(f"{i}:{get_repr(j)}" for i, j in kwargs.items())}')
         result = func(*args, **kwargs)
-
-        if path_to_file_log is not None:
-            with open(path_to_file_log, 'a') as fl:
-                fl.write(f'result: {str(result)}\n')
+        log.debug(f'function {func.__name__} result: {get_repr(result)}')
 
         return result
 
     return wrapper
 
 
+class MetricsRegistry:
+    """Counters, gauges and histograms of latency (ns) of contact book (tuning metrics_enabled).
+    Disabled registry costs one check of flag per call. Dump: JSON or text format of Prometheus"""
+
+    buckets = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000, 10_000_000_000)
+
+    __registry = None
+
+    @classmethod
+    def get(cls) -> 'MetricsRegistry':
+        """registry of application (it is created on first call)"""
+        if cls.__registry is None:
+            cls.__registry = cls(enabled=get_tuning_value('metrics_enabled'))
+        return cls.__registry
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.__counters: dict = {}
+        self.__gauges: dict = {'contacts_live': Contact.count}
+        self.__histograms: dict = {}  # name -> [counts of buckets (+Inf last), sum, count]
+
+    def inc(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value) -> None:
+        """value - number or function without arguments (it is called on dump)"""
+        self.__gauges[name] = value
+
+    def observe(self, name: str, time_ns: int) -> None:
+        if not self.enabled:
+            return
+        histogram = self.__histograms.get(name)
+        if histogram is None:
+            histogram = self.__histograms[name] = [[0] * (len(self.buckets) + 1), 0, 0]
+        histogram[0][bisect.bisect_left(self.buckets, time_ns)] += 1
+        histogram[1] += time_ns
+        histogram[2] += 1
+
+    def timer(self, name: str) -> 'MetricsTimer':
+        """context manager: latency of block to histogram name"""
+        return MetricsTimer(registry=self, name=name)
+
+    def snapshot(self) -> dict:
+        return {'counters': dict(self.__counters),
+                'gauges': {name: value() if callable(value) else value for name, value in self.__gauges.items()},
+                'histograms': {name: {'buckets_ns': dict(zip((*self.buckets, '+Inf'), counts)),
+                                      'sum_ns': sum_ns,
+                                      'count': count}
+                               for name, (counts, sum_ns, count) in self.__histograms.items()}}
+
+    def dump_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=4)
+
+    def dump_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot['counters'].items():
+            lines += [f'# TYPE contact_book_{name}_total counter', f'contact_book_{name}_total {value}']
+        for name, value in snapshot['gauges'].items():
+            lines += [f'# TYPE contact_book_{name} gauge', f'contact_book_{name} {value}']
+        for name, histogram in snapshot['histograms'].items():
+            lines.append(f'# TYPE contact_book_{name}_seconds histogram')
+            cumulative = 0
+            for bound, count in histogram['buckets_ns'].items():
+                cumulative += count
+                le = bound if bound == '+Inf' else f'{bound / 1e9:g}'
+                lines.append(f'contact_book_{name}_seconds_bucket{{le="{le}"}} {cumulative}')
+            lines += [f'contact_book_{name}_seconds_sum {histogram["sum_ns"] / 1e9:g}',
+                      f'contact_book_{name}_seconds_count {histogram["count"]}']
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path_to_file_metrics, format_of_dump: str = None) -> None:
+        """write metrics to file, format by extension (.json or Prometheus text for others)"""
+        if format_of_dump is None:
+            format_of_dump = 'json' if str(path_to_file_metrics).endswith('.json') else 'prometheus'
+        with open_file_atomic(path_to_file=path_to_file_metrics, mode='w') as fm:
+            fm.write(self.dump_json() if format_of_dump == 'json' else self.dump_prometheus())
+
+    def dump_at_exit(self, path_to_file_metrics, format_of_dump: str = None) -> None:
+        import atexit
+        atexit.register(self.dump, path_to_file_metrics, format_of_dump)
+
+
+class MetricsTimer:
+    __slots__ = ('__registry', '__name', '__time_start')
+
+    def __init__(self, registry: MetricsRegistry, name: str):
+        self.__registry = registry
+        self.__name = name
+        self.__time_start = 0
+
+    def __enter__(self):
+        if self.__registry.enabled:
+            self.__time_start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.__time_start:
+            self.__registry.observe(self.__name, time.perf_counter_ns() - self.__time_start)
+            self.__registry.inc(self.__name if exc_type is None else f'{self.__name}_errors')
+
+
+def decorator_metrics(name: str):
+    """count of calls and histogram of latency of function (metric name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = MetricsRegistry.get()
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+
+            with MetricsTimer(registry=metrics, name=name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@decorator_metrics('search_phone')
 @decorator_args_kwargs
 def find_contact_by_phone(dict_contacts: dict,
                           phone_number: str
@@ -388,25 +1221,67 @@ def find_contact_by_phone(dict_contacts: dict,
     return dict_contacts.get(phone_number)
 
 
-def find_contact_by_name(dict_contacts: dict,
-                         contact_name: str) -> tuple:
-    contacts = ()
+@decorator_metrics('search_phone_prefix')
+def find_contact_by_phone_prefix(dict_contacts: dict,
+                                 phone_index: PhoneIndex,
+                                 phone_number: str
+                                 ) -> tuple:
+    return tuple(dict_contacts[i] for i in phone_index.find(phone_number))
+
+
+@decorator_metrics('search_phone_range')
+def find_contact_by_phone_range(dict_contacts: dict,
+                                phone_index: PhoneIndex,
+                                phone_number_start: str,
+                                phone_number_stop: str
+                                ) -> tuple:
+    return tuple(dict_contacts[i] for i in phone_index.find_range(phone_number_start, phone_number_stop))
+
+
+def iter_contact_by_name(dict_contacts: dict,
+                         contact_name: str,
+                         infix_index: InfixIndex = None,
+                         limit: int = None):
+    """generator of contacts with name contains contact_name"""
+    if infix_index is not None:
+        for phone_number in infix_index.find(contact_name, limit=limit):
+            yield dict_contacts[phone_number]
+        return
+
+    contact_name = normalize_name(contact_name)
+    cnt = 0
     for obj in dict_contacts.values():
-        if obj.contact_name.upper().find(contact_name.upper()) >= 0:
-            contacts += (obj,)
-    return contacts
+        if cnt == limit:
+            return
+        if contact_name in normalize_name(obj.contact_name):
+            yield obj
+            cnt += 1
+
+
+@decorator_metrics('search_name')
+def find_contact_by_name(dict_contacts: dict,
+                         contact_name: str,
+                         infix_index: InfixIndex = None,
+                         limit: int = None) -> tuple:
+    return tuple(iter_contact_by_name(dict_contacts=dict_contacts,
+                                      contact_name=contact_name,
+                                      infix_index=infix_index,
+                                      limit=limit))
 
 
+@decorator_metrics('search_name_index')
 @decorator_time_lost
-def find_contact_by_name_(names_dict: dict,
+def find_contact_by_name_(names_dict: NamesIndex,
                           dict_contacts: dict,
-                          contact_name: str
+                          contact_name: str,
+                          infix_index: InfixIndex = None
                           ) -> tuple:
-    contacts = names_dict.get(contact_name.upper())
+    contacts = tuple(dict_contacts[phone_number] for phone_number in names_dict.find(contact_name))
 
-    if contacts is None:
+    if not contacts:
         contacts = find_contact_by_name(dict_contacts=dict_contacts,
-                                        contact_name=contact_name)
+                                        contact_name=contact_name,
+                                        infix_index=infix_index)
     return contacts
 
 
@@ -434,8 +1309,11 @@ def edit_contact(contact: Contact) -> Contact:
 
 
 def get_mark_print(len_obj: int,
-                   num_of_lines: int = get_tuning_value('num_of_lines')
+                   num_of_lines: int = None
                    ) -> int:
+    if num_of_lines is None:
+        num_of_lines = get_tuning_value('num_of_lines')
+
     if len_obj <= num_of_lines:
         mark_print: int = get_tuning_value('mark_print')
     else:
@@ -444,21 +1322,79 @@ def get_mark_print(len_obj: int,
     return 1 if mark_print == 0 else mark_print
 
 
-def print_contacts(dict_contacts: dict) -> None:
-    cnt_rows: int = 0
+class ContactsCursor:
+    """Pages of contacts in order of names. Order is taken from OrderIndex, which is maintained
+    by hooks, so page is got by slice of index (without sort of contact book)"""
+
+    __slots__ = ('__dict_contacts',
+                 '__order_index',
+                 '__page_size',
+                 '__position',
+                 )
+
+    def __init__(self, dict_contacts: dict, order_index: OrderIndex = None, page_size: int = None):
+        self.__dict_contacts = dict_contacts
+        self.__order_index = order_index if order_index is not None else OrderIndex(dict_contacts=dict_contacts)
+        self.__page_size = page_size or get_tuning_value('num_of_lines')
+        self.__position = 0
+
+    @property
+    def position(self) -> int:
+        return self.__position
+
+    @property
+    def page_size(self) -> int:
+        return self.__page_size
+
+    def __len__(self):
+        """count of pages"""
+        return -(-len(self.__order_index) // self.__page_size)
+
+    def __contacts(self, start: int) -> list:
+        return [self.__dict_contacts[phone_number]
+                for phone_number in self.__order_index.phones_at(start, start + self.__page_size)]
+
+    def page(self, num: int) -> list:
+        """contacts of page num (from 0), cursor is moved to next page"""
+        self.__position = max(num, 0) * self.__page_size
+        return self.next_page()
+
+    def seek(self, name: str) -> int:
+        """move cursor to first contact with name >= name, return position"""
+        self.__position = self.__order_index.position(name)
+        return self.__position
+
+    def next_page(self) -> list:
+        contacts = self.__contacts(self.__position)
+        self.__position += len(contacts)
+        return contacts
+
+    def prev_page(self) -> list:
+        self.__position = max(self.__position - 2 * self.__page_size, 0)
+        return self.next_page()
+
+
+def print_contacts(dict_contacts: dict, order_index: OrderIndex = None) -> None:
+    """print contacts by pages in order of names: Enter - next page, name - seek to it, "Q" - stop"""
     if dict_contacts:
-        list_contacts = sorted_dict_contacts(dict_contacts=dict_contacts)
+        cursor = ContactsCursor(dict_contacts=dict_contacts,
+                                order_index=order_index,
+                                page_size=get_mark_print(len_obj=len(dict_contacts)))
 
-        mark_print = get_mark_print(len_obj=len(list_contacts))
+        while True:
+            contacts = cursor.next_page()
+            for contact in contacts:
+                print(contact)
 
-        for _, contact in list_contacts:
-            print(contact)
-            cnt_rows += 1
-            if cnt_rows % mark_print == 0:
-                input('Press any key to continue...')
+            if cursor.position >= len(dict_contacts):
+                input('Output is finish. Press any key to continue...')
+                break
 
-        if cnt_rows % mark_print != 0:
-            input('Output is finish. Press any key to continue...')
+            answer = input('Press Enter to continue (name - go to it, "Q" - return)...').strip()
+            if answer.upper() == 'Q':
+                break
+            if answer:
+                cursor.seek(answer)
     else:
         print(f'{"="*22}\n'
               f'Contact book is empty!\n'
@@ -477,323 +1413,2671 @@ def create_file_log(path_to_file_log: pathlib.Path):
     return True
 
 
-def full_download_dbase(path_to_file_dbase=pathlib.Path(get_tuning_value('path_to_dbase')
-                                                        + os.sep + 'contact-book.dbase'),
-                        mark_print=None) -> tuple:
-    base_dict: dict = {}
+class DbaseFooter:
+    """Last line of file dbase with checksum (crc32) of all rows before it, count of rows and
+    version of file (it is incremented by every write of shared file dbase):
+    "#crc32=<8 hex digits>;rows=<count>;version=<version>"
+    File without footer (old or handmade file) is loaded without verification"""
 
-    try:
-        if not pathlib.Path(path_to_file_dbase).exists():
-            raise FileBaseNotFound
-    except FileBaseNotFound:
-        if not create_file_base(path_to_file_dbase=path_to_file_dbase):
-            return tuple()
+    __prefix = b'#crc32='
 
-    cnt_rows: int = 0
-    mask = Contact.mask_date_time_creation()
+    @classmethod
+    def prefix(cls) -> bytes:
+        return cls.__prefix
 
-    with open(path_to_file_dbase, 'r') as fb:
-        len_fb = sum(1 for _ in fb)
-        if mark_print is None:
-            mark_print = get_mark_print(len_fb)  # count rows in file
+    @classmethod
+    def footer(cls, checksum: int, cnt_rows: int, version: int = None) -> bytes:
+        version = '' if version is None else f';version={version}'
+        return cls.__prefix + f'{checksum:08x};rows={cnt_rows}{version}\n'.encode()
 
-    with open(path_to_file_dbase, 'r') as fb:
-        for rec in fb:
-            contact = rec.rstrip('\n').split(get_tuning_value('sep_in_dbase'))  # it's tuning
-            base_dict[contact[0]] = Contact(phone_number=contact[0],
-                                            contact_name=contact[1],
-                                            date_time_creation_contact=datetime.datetime.strptime(contact[2], mask),
-                                            validate=False)
+    @classmethod
+    def fields(cls, footer: bytes) -> dict:
+        """{'crc32': ..., 'rows': ..., 'version': ...} (values are strings)"""
+        footer = footer.decode().strip()
+        return dict(field.split('=', 1) for field in footer[1:].split(';'))
 
-            cnt_rows += 1
-            if (len_fb // mark_print) >= 2 and cnt_rows % mark_print == 0:
-                print(f'download {cnt_rows} rows')
+    @classmethod
+    def version(cls, footer: bytes) -> int:
+        """version of file dbase, 0 for file without footer or version"""
+        if not footer.startswith(cls.__prefix):
+            return 0
+        try:
+            return int(cls.fields(footer=footer).get('version', 0))
+        except ValueError:
+            return 0
 
-    if cnt_rows > 0:
-        print(f'total download {cnt_rows} rows')
+    @classmethod
+    def verify(cls, footer: bytes, checksum: int, cnt_rows: int) -> None:
+        try:
+            fields = cls.fields(footer=footer)
+            if int(fields['crc32'], 16) != checksum or int(fields['rows']) != cnt_rows:
+                raise FileBaseCorrupted
+        except (ValueError, KeyError, FileBaseCorrupted):
+            print(FileBaseCorrupted.message())
+            raise FileBaseCorrupted
 
-    return base_dict, path_to_file_dbase
 
+class Durability:
+    """fsync policy (tuning durability): 'always' - fsync every write,
+    'batch' - fsync every fsync_batch write, 'none' - without fsync (only OS cache)"""
 
-def create_cash_names(dict_contacts: dict) -> dict:
-    names_dict: dict = {}
+    __cnt_writes = 0
 
-    for contact in dict_contacts.values():
-        part_of_contact_name = ''
-        for i in contact.contact_name:
-            part_of_contact_name += i.upper()
-            if names_dict.get(part_of_contact_name):
-                names_dict[part_of_contact_name] = names_dict[part_of_contact_name] + (contact,)
-            else:
-                names_dict[part_of_contact_name] = (contact,)
-    return names_dict
+    @classmethod
+    def sync(cls, file_obj, force: bool = False) -> bool:
+        if not force:
+            durability = get_tuning_value('durability')
+            if durability == 'none':
+                return False
+            if durability == 'batch':
+                cls.__cnt_writes += 1
+                if cls.__cnt_writes % get_tuning_value('fsync_batch'):
+                    return False
 
+        file_obj.flush()
+        os.fsync(file_obj.fileno())
+        return True
 
-# @decorator_args_kwargs
-def full_upload_dbase(dbase_dict: dict,
-                      path_to_file_dbase: pathlib.Path,
-                      mark_print=None) -> None:
-    try:
-        if not pathlib.Path(path_to_file_dbase).exists():
-            raise FileBaseNotFound
-    except FileBaseNotFound:
-        if not create_file_base(path_to_file_dbase=path_to_file_dbase):
-            raise FileBaseNotCreated
+    @classmethod
+    def sync_dir(cls, path_to_dir) -> None:
+        """fsync of directory, so rename of file in it is durable"""
+        try:
+            fd = os.open(path_to_dir, os.O_RDONLY)
+        except OSError:
+            return  # it isn't supported (Windows)
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
 
-    cnt_rows: int = 0
-    len_dbase_dict: int = len(dbase_dict)
 
-    if mark_print is None:
-        mark_print = get_mark_print(len_obj=len_dbase_dict)
+@contextlib.contextmanager
+def open_file_atomic(path_to_file, mode: str = 'w'):
+    """file is written to sibling temp file, which replaces path_to_file only after successful write,
+    so crash or full disk don't leave truncated file"""
+    path_to_file = pathlib.Path(path_to_file)
+    path_to_file_tmp = path_to_file.with_name(f'{path_to_file.name}.tmp')
 
-    with open(path_to_file_dbase, 'w') as fb:
-        for _, contact in dbase_dict.items():
-            fb.write(f'{contact.format_to_dbase}\n')
-            cnt_rows += 1
-            if (len_dbase_dict // mark_print) >= 2 and cnt_rows % mark_print == 0:
-                print(f'upload {cnt_rows} rows...')
+    try:
+        with open(path_to_file_tmp, mode) as file_tmp:
+            yield file_tmp
+            file_tmp.flush()
+            synced = Durability.sync(file_obj=file_tmp)
+
+        os.replace(path_to_file_tmp, path_to_file)
+        if synced:
+            Durability.sync_dir(path_to_dir=path_to_file.parent)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(path_to_file_tmp)
+        raise
+
+
+def parse_date_time_creation(value: str,
+                             mask: str = Contact.mask_date_time_creation()
+                             ) -> datetime.datetime:
+    """fast parsing of date and time of creation contact ("dd.mm.YYYY HH:MM:SS")"""
+    try:
+        if len(value) == 19 and value[2] == value[5] == '.' and value[10] == ' ' and value[13] == value[16] == ':':
+            return datetime.datetime(int(value[6:10]), int(value[3:5]), int(value[0:2]),
+                                     int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except ValueError:
+        pass
 
-    if cnt_rows > 0:
-        print(f'total upload {cnt_rows} rows...')
+    return datetime.datetime.strptime(value, mask)  # slow path, it raise ValueError for bad value
 
 
-def full_backup_dbase(
-                        dbase_dict: dict,
-                        format_of_backup = 'json',
-                        path_to_file_dbase=None,
-                        mark_print=None
-                      ) -> pathlib.Path:
-    try:
-        if not path_to_file_dbase:
-            file_name_of_backup = get_tuning_value('file_name_of_backup')
-            extension_file = {
-                              'json':'json',
-                              'pickle':'pickle'
-                             }
-
-            if format_of_backup.lower() in extension_file.keys():
-                file_name_of_backup = (
-                                       f'{file_name_of_backup}.'
-                                       f'{extension_file.get(format_of_backup.lower())}'
-                                       )
-            else:
-                 raise UnknownFormatOfBackupError
+def iter_dbase_records(path_to_file_dbase,
+                       mark_print=None,
+                       chunk_size: int = None):
+    """generator of records (phone number, contact name, date and time of creation) from file dbase,
+    file is read once by big chunks"""
+    if chunk_size is None:
+        chunk_size = get_tuning_value('chunk_size')
 
-            path_to_file_dbase = pathlib.Path(
-                                               f'{get_tuning_value("path_to_dbase")}'
-                                               f'{os.sep}'
-                                               f'{file_name_of_backup}'
-                                              )
-        if not pathlib.Path(path_to_file_dbase).exists():
-            raise FileBaseNotFound
-    except FileBaseNotFound:
-        if format_of_backup.lower() == 'json':
-            if not create_file_base(path_to_file_dbase = path_to_file_dbase):
-                raise FileBaseNotCreated
+    sep = get_tuning_value('sep_in_dbase')  # it's tuning
+    size_fb = os.path.getsize(path_to_file_dbase)
 
-    dict2json = {}
+    cnt_rows: int = 0
+    cnt_rows_mark: int = 0
+    offset: int = 0
+    checksum: int = 0
+    footer: bytes = b''
+
+    with open(path_to_file_dbase, 'rb') as fb:
+        tail = b''
+        while True:
+            chunk = fb.read(chunk_size)
+            offset += len(chunk)
+
+            if chunk:
+                # the last line is kept in tail up to end of file, it can be footer with checksum
+                buf = tail + chunk
+                cut = buf.rfind(b'\n', 0, len(buf) - 1) + 1
+                block, tail = buf[:cut], buf[cut:]
+            elif tail.startswith(DbaseFooter.prefix()):
+                block, footer = b'', tail
+            else:
+                block = tail
 
-    cnt_rows = 0
-    len_dbase_dict = len(dbase_dict)
-    if mark_print is None:
-        mark_print = get_mark_print(len_obj=len_dbase_dict)
+            checksum = zlib.crc32(block, checksum)
 
-    for _, contact in dbase_dict.items():
-        dict2json = {**dict2json, **contact.dict}
-        cnt_rows += 1
-        if (len_dbase_dict // mark_print) >= 2 and cnt_rows % mark_print == 0:
-            print(f'prepared {cnt_rows} rows...')
+            # not splitlines: it also splits on \x0b, \x1c, \u2028..., which can be in names
+            for rec in block.decode().split('\n'):
+                if not rec:
+                    continue
 
-    if cnt_rows > 0:
-        print(f'total prepared {cnt_rows} rows...')
+                yield rec.rstrip('\r').split(sep)
+                cnt_rows += 1
 
-    mode_file = 'w'
-    if format_of_backup.lower() == 'pickle':
-        mode_file +='b+'
-    with open(path_to_file_dbase, mode_file) as file_backup:
+            if not chunk:
+                break
 
-        if format_of_backup.lower() == 'json':
-            json.dump(dict2json, file_backup, indent=4)
+            if size_fb > chunk_size and (mark_print is None or cnt_rows - cnt_rows_mark >= mark_print):
+                cnt_rows_mark = cnt_rows
+                print(f'download {cnt_rows} rows ({offset * 100 // size_fb}%)')
 
-        elif format_of_backup.lower() == 'pickle':
-            pickle.dump(dict2json, file_backup)
+    if footer:
+        DbaseFooter.verify(footer=footer, checksum=checksum, cnt_rows=cnt_rows)
 
-    return path_to_file_dbase
+    if cnt_rows > 0:
+        print(f'total download {cnt_rows} rows')
 
 
-def main():
-    welcome_text = get_tuning_value('welcome_text')  # it's tuning
+def iter_download_dbase(path_to_file_dbase,
+                        mark_print=None,
+                        chunk_size: int = None):
+    """generator of contacts from file dbase"""
+
+    # many contacts have the same date and time of creation, so parsed values are cached
+    cash_date_time: dict = {}
+
+    for contact in iter_dbase_records(path_to_file_dbase=path_to_file_dbase,
+                                      mark_print=mark_print,
+                                      chunk_size=chunk_size):
+        date_time_creation_contact = cash_date_time.get(contact[2])
+        if date_time_creation_contact is None:
+            if len(cash_date_time) >= 4096:
+                cash_date_time.clear()
+            date_time_creation_contact = parse_date_time_creation(contact[2])
+            cash_date_time[contact[2]] = date_time_creation_contact
+
+        yield Contact(phone_number=contact[0],
+                      contact_name=contact[1],
+                      date_time_creation_contact=date_time_creation_contact,
+                      validate=False)
+
+
+def download_dbase_to_store(path_to_file_dbase,
+                            mark_print=None,
+                            chunk_size: int = None) -> ContactStore:
+    """load file dbase to columnar store, without creation of objects Contact"""
+    store = ContactStore()
+    cash_seconds: dict = {}
+
+    for contact in iter_dbase_records(path_to_file_dbase=path_to_file_dbase,
+                                      mark_print=mark_print,
+                                      chunk_size=chunk_size):
+        seconds = cash_seconds.get(contact[2])
+        if seconds is None:
+            if len(cash_seconds) >= 4096:
+                cash_seconds.clear()
+            seconds = ContactStore.seconds(parse_date_time_creation(contact[2]))
+            cash_seconds[contact[2]] = seconds
+
+        store.put_record(phone_number=contact[0], contact_name=contact[1], seconds=seconds)
+
+    return store
+
+
+def get_dbase_chunks(path_to_file_dbase, cnt_chunks: int) -> tuple:
+    """byte offsets (start, stop) of chunks of file dbase aligned on begin of line and footer (or b'')"""
+    size_fb = os.path.getsize(path_to_file_dbase)
+
+    with open(path_to_file_dbase, 'rb') as fb:
+        # footer is the last line of file
+        fb.seek(max(size_fb - 64, 0))
+        tail = fb.read()
+        start_footer = size_fb - len(tail) + tail.rfind(b'\n', 0, len(tail) - 1) + 1
+        footer = tail[start_footer - size_fb + len(tail):]
+        if footer.startswith(DbaseFooter.prefix()):
+            size_fb = start_footer
+        else:
+            footer = b''
 
-    menu_text = ('Select on action (enter number) and press key Enter:',
-                 '1. Add contact',
-                 '2. Find contact',
-                 '3. Show all contacts',
-                 '4. Remove contact',
-                 '5. Edit contact',
-                 '6. Backup contact book (json)',
-                 '7. Save contact book to disk',
-                 '8. Exit',
-                 '9. Backup contact book (pickle)')
+        offsets = [0]
+        for num in range(1, cnt_chunks):
+            fb.seek(max(size_fb * num // cnt_chunks - 1, offsets[-1]))
+            fb.readline()
+            if fb.tell() >= size_fb:
+                break
+            if fb.tell() > offsets[-1]:
+                offsets.append(fb.tell())
+        offsets.append(size_fb)
 
-    menu_text = '\n'.join(menu_text)
+    return tuple(zip(offsets, offsets[1:])), footer
 
-    print(welcome_text)
 
-    contacts, cur_path_to_file_dbase = full_download_dbase()
-    names = {}
+def parse_dbase_chunk(path_to_file_dbase, start: int, stop: int) -> tuple:
+    """work of process for parallel download: rows of chunk of file dbase to columnar batch
+    (phone numbers and contact names - bytes with separator \\n, seconds of creation - array 'q')"""
+    sep = get_tuning_value('sep_in_dbase')
+    cash_seconds: dict = {}
+    phones = []
+    names = []
+    seconds = array.array('q')
 
-    assert cur_path_to_file_dbase  # check file db
+    with open(path_to_file_dbase, 'rb') as fb:
+        fb.seek(start)
+        block = fb.read(stop - start)
 
-    contacts_change = False
+    for rec in block.decode().split('\n'):
+        if not rec:
+            continue
 
-    while True:
+        phone_number, contact_name, date_time_creation_contact = rec.rstrip('\r').split(sep)
+        sec = cash_seconds.get(date_time_creation_contact)
+        if sec is None:
+            sec = ContactStore.seconds(parse_date_time_creation(date_time_creation_contact))
+            cash_seconds[date_time_creation_contact] = sec
 
-        print(menu_text)  # main menu
+        phones.append(phone_number)
+        names.append(contact_name)
+        seconds.append(sec)
 
-        try:
-            action = int(input('Select action and press the key Enter>> '))
-            if action not in (range(1, len(menu_text))):
-                raise UnknownAction
-
-            if action == 8:
-                if contacts_change:
-                    if not input('You have made changes. Save to disk? '
-                                 '("Y" - Press any key / "N" - exit without saving)>> ').upper() == 'N':
-                        full_upload_dbase(dbase_dict=contacts, path_to_file_dbase=cur_path_to_file_dbase)
-                break
+    return '\n'.join(phones).encode(), '\n'.join(names).encode(), seconds
 
-            while True:
-                if action == 1:
-                    try:
-                        contact = create_contact()
 
-                        find_contact = find_contact_by_phone(dict_contacts=contacts,
-                                                             phone_number=contact.phone_number)
+def download_dbase_parallel(path_to_file_dbase,
+                            workers: int,
+                            mark_print=None,
+                            contact_store: str = 'dict'):
+    """chunks of file dbase are parsed by pool of processes, batches are merged in order of file
+    (so the last row with the same phone number wins, like in sequential download)"""
+    import concurrent.futures
 
-                        if find_contact is None:
-                            contacts[contact.phone_number] = contact
-                            contacts_change = True
-                            raise ExitInMainMenu
-                        else:
-                            raise ContactExistInFileDBase
-
-                    except (NoneContactName, NoVerifiedPhoneNumber, ExitInMainMenu):
-                        if input('Add another? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                            break
-                    except ContactExistInFileDBase:
-                        del contact
-                        if input(f'Contact exist!'
-                                 f'Repeat another? ("Y" - Press any key / "N" - return main menu)>> '
-                                 ).upper() == 'N':
-                            break
-
-                if action == 2:
-                    try:
-                        search_type = int(input('1 - find by phone, 2 - find by contact name>> '))
-
-                        if search_type not in range(1, 3):
-                            raise UnknownAction
-
-                        if search_type == 1:
-                                contact = (find_contact_by_phone(dict_contacts=contacts,
-                                                                 phone_number=input('Enter phone for search>> ')),)
-                        elif search_type == 1:
-                                if not names:
-                                    names = create_cash_names(dict_contacts=contacts)
-
-                                contact = find_contact_by_name_(names_dict=names,
-                                                                dict_contacts=contacts,
-                                                                contact_name=input('Enter name for search>> '))
-                        else:
-                                contact = None
+    chunks, footer = get_dbase_chunks(path_to_file_dbase=path_to_file_dbase, cnt_chunks=workers * 4)
+    base_dict = ContactStore() if contact_store == 'columnar' else {}
+    cash_date_time: dict = {}
 
-                        if contact is None:
-                            raise ContactNotFound
-                        else:
-                            contact = {i.phone_number: i for i in contact}
-                            print_contacts(contact)
+    cnt_rows: int = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = executor.map(parse_dbase_chunk,
+                               (path_to_file_dbase,) * len(chunks),
+                               (start for start, _ in chunks),
+                               (stop for _, stop in chunks))
+
+        # checksum for footer is counted while workers parse chunks
+        checksum: int = 0
+        if footer:
+            size_rows = chunks[-1][1]
+            chunk_size = get_tuning_value('chunk_size')
+            with open(path_to_file_dbase, 'rb') as fb:
+                while fb.tell() < size_rows:
+                    checksum = zlib.crc32(fb.read(min(chunk_size, size_rows - fb.tell())), checksum)
+
+        for phones, names, seconds in batches:
+            if not seconds:
+                continue
+
+            if contact_store == 'columnar':
+                for phone_number, contact_name, sec in zip(phones.decode().split('\n'),
+                                                           names.decode().split('\n'),
+                                                           seconds):
+                    base_dict.put_record(phone_number=phone_number, contact_name=contact_name, seconds=sec)
+            else:
+                for phone_number, contact_name, sec in zip(phones.decode().split('\n'),
+                                                           names.decode().split('\n'),
+                                                           seconds):
+                    date_time_creation_contact = cash_date_time.get(sec)
+                    if date_time_creation_contact is None:
+                        date_time_creation_contact = ContactStore.date_time(sec)
+                        cash_date_time[sec] = date_time_creation_contact
+                    base_dict[phone_number] = Contact(phone_number=phone_number,
+                                                      contact_name=contact_name,
+                                                      date_time_creation_contact=date_time_creation_contact,
+                                                      validate=False)
+
+            cnt_rows_mark, cnt_rows = cnt_rows, cnt_rows + len(seconds)
+            if mark_print is None or cnt_rows // mark_print != cnt_rows_mark // mark_print:
+                print(f'download {cnt_rows} rows')
 
-                            if input('Repeat find? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                                break
-                    except ContactNotFound:
-                        if input('Sorry, contact is not found. Repeat?'
-                                 '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                            break
-
-                    except (UnknownAction, ValueError):
-                        if input('Sorry, you select unknown action. Repeat?'
-                                 '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                            break
-
-                if action == 3:
-                    print_contacts(contacts)
+    if footer:
+        DbaseFooter.verify(footer=footer, checksum=checksum, cnt_rows=cnt_rows)
+
+    if cnt_rows > 0:
+        print(f'total download {cnt_rows} rows')
+
+    return base_dict
+
+
+class MappedContacts:
+    """Binary file dbase opened by mmap with interface of dict (phone number -> Contact).
+    File: header (magic, version, count of records, offset of table), packed records
+    (length of phone, length of name, seconds of creation, phone, name) and table of offsets
+    of records sorted by phone number. Objects Contact are created only on access,
+    changes are kept in memory (added/deleted) up to saving by write_binary_dbase"""
+
+    __magic = b'CNTBOOK\x00'
+    __version = 1
+    __header = struct.Struct('<8sIQQ')  # magic, version, count of records, offset of table
+    __record = struct.Struct('<BHq')  # length of phone, length of name, seconds of creation
+
+    __slots__ = ('__file',
+                 '__mmap',
+                 '__table',
+                 '__cnt_base',
+                 '__added',
+                 '__deleted',
+                 '__cnt_new',
+                 )
+
+    @classmethod
+    def is_binary_dbase(cls, path_to_file_dbase) -> bool:
+        with open(path_to_file_dbase, 'rb') as fb:
+            return fb.read(len(cls.__magic)) == cls.__magic
+
+    @classmethod
+    def write(cls, dbase_dict: dict, file_obj) -> int:
+        """write contacts to binary file (opened 'wb'), return count of records"""
+        phones = sorted(dbase_dict.keys())
+        offsets = array.array('Q')
+        offset = cls.__header.size
+
+        file_obj.write(b'\x00' * cls.__header.size)
+        batch: list = []
+        for phone_number in phones:
+            contact = dbase_dict[phone_number]
+            phone_bytes = phone_number.encode()
+            name_bytes = contact.contact_name.encode()
+            rec = (cls.__record.pack(len(phone_bytes), len(name_bytes),
+                                     ContactStore.seconds(contact.date_time_creation_contact))
+                   + phone_bytes + name_bytes)
+            offsets.append(offset)
+            offset += len(rec)
+            batch.append(rec)
+
+            if len(batch) >= 4096:
+                file_obj.write(b''.join(batch))
+                batch.clear()
+
+        file_obj.write(b''.join(batch))
+        file_obj.write(offsets.tobytes())
+        file_obj.seek(0)
+        file_obj.write(cls.__header.pack(cls.__magic, cls.__version, len(phones), offset))
+        file_obj.seek(0, os.SEEK_END)
+
+        return len(phones)
+
+    def __init__(self, path_to_file_dbase):
+        import mmap
+
+        self.__file = open(path_to_file_dbase, 'rb')
+        self.__added: dict = {}
+        self.__deleted: set = set()
+        self.__cnt_new = 0  # added phone numbers, which are not in file
+
+        try:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.__cnt_base, offset_table = self.__header.unpack_from(self.__mmap, 0)
+            if magic != self.__magic or version != self.__version:
+                raise FileBaseCorrupted
+            self.__table = memoryview(self.__mmap)[offset_table:offset_table + 8 * self.__cnt_base].cast('Q')
+        except (ValueError, struct.error, FileBaseCorrupted):
+            self.__file.close()
+            print(FileBaseCorrupted.message())
+            raise FileBaseCorrupted
+
+    def close(self) -> None:
+        self.__table.release()
+        self.__mmap.close()
+        self.__file.close()
+
+    def __record_at(self, num: int) -> tuple:
+        """(offset of phone, length of phone, length of name, seconds) of num record of table"""
+        offset = self.__table[num]
+        len_phone, len_name, seconds = self.__record.unpack_from(self.__mmap, offset)
+        return offset + self.__record.size, len_phone, len_name, seconds
+
+    def __phone_at(self, num: int) -> bytes:
+        offset, len_phone, _, _ = self.__record_at(num)
+        return self.__mmap[offset:offset + len_phone]
+
+    def __bisect(self, phone_bytes: bytes) -> int:
+        """first num of table with phone >= phone_bytes"""
+        lo, hi = 0, self.__cnt_base
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.__phone_at(mid) < phone_bytes:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __find(self, phone_number: str) -> int:
+        phone_bytes = phone_number.encode()
+        num = self.__bisect(phone_bytes)
+        if num < self.__cnt_base and self.__phone_at(num) == phone_bytes:
+            return num
+        return -1
+
+    def __contact_at(self, num: int) -> Contact:
+        offset, len_phone, len_name, seconds = self.__record_at(num)
+        return Contact(phone_number=self.__mmap[offset:offset + len_phone].decode(),
+                       contact_name=self.__mmap[offset + len_phone:offset + len_phone + len_name].decode(),
+                       date_time_creation_contact=ContactStore.date_time(seconds),
+                       validate=False)
+
+    def __len__(self):
+        return self.__cnt_base - len(self.__deleted) + self.__cnt_new
+
+    def __contains__(self, phone_number: str) -> bool:
+        if phone_number in self.__added:
+            return True
+        return phone_number not in self.__deleted and self.__find(phone_number) >= 0
+
+    def __getitem__(self, phone_number: str) -> Contact:
+        contact = self.__added.get(phone_number)
+        if contact is not None:
+            return contact
+
+        num = self.__find(phone_number) if phone_number not in self.__deleted else -1
+        if num < 0:
+            raise KeyError(phone_number)
+        return self.__contact_at(num)
+
+    def get(self, phone_number: str, default=None):
+        try:
+            return self[phone_number]
+        except KeyError:
+            return default
+
+    def __setitem__(self, phone_number: str, contact: Contact):
+        if phone_number in self.__deleted:
+            self.__deleted.discard(phone_number)
+        elif phone_number not in self.__added and self.__find(phone_number) < 0:
+            self.__cnt_new += 1
+        self.__added[phone_number] = contact
+
+    def __delitem__(self, phone_number: str):
+        in_file = phone_number not in self.__deleted and self.__find(phone_number) >= 0
+        if phone_number in self.__added:
+            del self.__added[phone_number]
+            if not in_file:
+                self.__cnt_new -= 1
+        elif not in_file:
+            raise KeyError(phone_number)
+
+        if in_file:
+            self.__deleted.add(phone_number)
+
+    def __iter__(self):
+        """phone numbers of file (in sorted order), then new phone numbers"""
+        for num in range(self.__cnt_base):
+            phone_number = self.__phone_at(num).decode()
+            if phone_number not in self.__deleted:
+                yield phone_number
+
+        for phone_number in self.__added:
+            if self.__find(phone_number) < 0:
+                yield phone_number
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (self[phone_number] for phone_number in self)
+
+    def items(self):
+        return ((phone_number, self[phone_number]) for phone_number in self)
+
+    def find_prefix(self, prefix: str) -> list:
+        """phone numbers of file and new phone numbers beginning with prefix (table is sorted by phone)"""
+        prefix_bytes = prefix.encode()
+        phones = []
+        for num in range(self.__bisect(prefix_bytes), self.__cnt_base):
+            phone_bytes = self.__phone_at(num)
+            if not phone_bytes.startswith(prefix_bytes):
+                break
+            phone_number = phone_bytes.decode()
+            if phone_number not in self.__deleted and phone_number not in self.__added:
+                phones.append(phone_number)
+
+        phones.extend(phone_number for phone_number in self.__added if phone_number.startswith(prefix))
+        return sorted(phones)
+
+
+def write_binary_dbase(dbase_dict: dict, path_to_file_dbase) -> None:
+    """write contact book to binary file dbase (MappedContacts), file is replaced atomically"""
+    with open_file_atomic(path_to_file=path_to_file_dbase, mode='wb') as fb:
+        cnt_rows = MappedContacts.write(dbase_dict=dbase_dict, file_obj=fb)
+
+    if cnt_rows > 0:
+        print(f'total upload {cnt_rows} rows...')
+
+
+def convert_dbase_to_binary(path_to_file_dbase, path_to_file_binary) -> None:
+    """file dbase (';' separated rows) to binary file dbase"""
+    dbase_dict, _ = full_download_dbase(path_to_file_dbase=path_to_file_dbase, contact_store='columnar')
+    write_binary_dbase(dbase_dict=dbase_dict, path_to_file_dbase=path_to_file_binary)
+
+
+def convert_binary_to_dbase(path_to_file_binary, path_to_file_dbase) -> None:
+    """binary file dbase to file dbase (';' separated rows)"""
+    dbase_dict = MappedContacts(path_to_file_dbase=path_to_file_binary)
+    try:
+        full_upload_dbase(dbase_dict=dbase_dict, path_to_file_dbase=path_to_file_dbase)
+    finally:
+        dbase_dict.close()
+
+
+def get_path_to_file_snapshot(path_to_file_dbase) -> pathlib.Path:
+    return pathlib.Path(f'{path_to_file_dbase}.snapshot')
+
+
+def get_snapshot_key(path_to_file_dbase, contact_store: str) -> tuple:
+    """key of snapshot: size, mtime and hash of content of file dbase (footer with crc32 or crc32 of file)"""
+    stat = os.stat(path_to_file_dbase)
+
+    with open(path_to_file_dbase, 'rb') as fb:
+        fb.seek(max(stat.st_size - 64, 0))
+        tail = fb.read()
+        content_hash = tail[tail.rfind(b'\n', 0, len(tail) - 1) + 1:]
+
+        if not content_hash.startswith(DbaseFooter.prefix()):
+            fb.seek(0)
+            checksum: int = 0
+            for chunk in iter(lambda: fb.read(get_tuning_value('chunk_size')), b''):
+                checksum = zlib.crc32(chunk, checksum)
+            content_hash = checksum
+
+    # last item is version of content of snapshot (it is changed with set or format of indexes)
+    return stat.st_size, stat.st_mtime_ns, content_hash, contact_store, 3
+
+
+def load_snapshot(path_to_file_dbase, key: tuple, with_indexes: bool = True):
+    """(contact book, indexes or None) from snapshot, None if snapshot is absent or stale"""
+    import pickle
+
+    try:
+        with open(get_path_to_file_snapshot(path_to_file_dbase=path_to_file_dbase), 'rb') as fs:
+            if pickle.load(fs) != key:
+                return None
+            base_dict = pickle.load(fs)
+            indexes = pickle.load(fs) if with_indexes else None
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+
+    return base_dict, indexes
+
+
+def write_snapshot(path_to_file_dbase, key: tuple, base_dict, indexes=None):
+    """contact book and indexes are serialized now (they are changed later), file is written by thread"""
+    import pickle
+    import threading
+
+    data = [pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL) for obj in (key, base_dict, indexes)]
+
+    def write():
+        with contextlib.suppress(OSError):
+            with open_file_atomic(path_to_file=get_path_to_file_snapshot(path_to_file_dbase=path_to_file_dbase),
+                                  mode='wb') as fs:
+                for obj in data:
+                    fs.write(obj)
+
+    thread = threading.Thread(target=write, name='write_snapshot')
+    thread.start()
+    return thread
+
+
+@decorator_metrics('load')
+def get_path_to_file_dbase() -> pathlib.Path:
+    """default file dbase (directory of contact book is created at first call)"""
+    return pathlib.Path(get_tuning_value('path_to_dbase')) / 'contact-book.dbase'
+
+
+def full_download_dbase(path_to_file_dbase=None,
+                        mark_print=None,
+                        contact_store: str = None,
+                        replay_journal: bool = True,
+                        workers: int = None,
+                        with_indexes: bool = False) -> tuple:
+    """contact book from file dbase (text or binary), with_indexes - also (names, infix, phones, order) indexes.
+    Text file dbase is loaded from snapshot (tuning dbase_snapshot) if file is not changed after it"""
+    if path_to_file_dbase is None:
+        path_to_file_dbase = get_path_to_file_dbase()
+
+    try:
+        if not pathlib.Path(path_to_file_dbase).exists():
+            raise FileBaseNotFound
+    except FileBaseNotFound:
+        if not create_file_base(path_to_file_dbase=path_to_file_dbase):
+            return tuple()
+
+    if replay_journal:
+        # changes of finished processes, which weren't folded into file dbase
+        SharedDbase(path_to_file_dbase=path_to_file_dbase).recover_journals()
+
+    if contact_store is None:
+        contact_store = get_tuning_value('contact_store')
+
+    if workers is None:
+        workers = get_tuning_value('download_workers')
+
+    binary = MappedContacts.is_binary_dbase(path_to_file_dbase=path_to_file_dbase)
+    snapshot = get_tuning_value('dbase_snapshot') and not binary
+
+    indexes = None
+    loaded = None
+    if snapshot:
+        key = get_snapshot_key(path_to_file_dbase=path_to_file_dbase, contact_store=contact_store)
+        loaded = load_snapshot(path_to_file_dbase=path_to_file_dbase, key=key, with_indexes=with_indexes)
+
+    if loaded is not None:
+        base_dict, indexes = loaded
+        print(f'total download {len(base_dict)} rows (snapshot)')
+    elif binary:
+        base_dict = MappedContacts(path_to_file_dbase=path_to_file_dbase)
+    elif workers > 1 and os.path.getsize(path_to_file_dbase) > get_tuning_value('chunk_size'):
+        base_dict = download_dbase_parallel(path_to_file_dbase=path_to_file_dbase,
+                                            workers=workers,
+                                            mark_print=mark_print,
+                                            contact_store=contact_store)
+    elif contact_store == 'columnar':
+        base_dict = download_dbase_to_store(path_to_file_dbase=path_to_file_dbase,
+                                            mark_print=mark_print)
+    else:
+        base_dict: dict = {contact.phone_number: contact
+                           for contact in iter_download_dbase(path_to_file_dbase=path_to_file_dbase,
+                                                              mark_print=mark_print)}
+
+    if with_indexes and indexes is None:
+        # binary file dbase is opened without reading of records, indexes would read all of them
+        indexes = create_lazy_indexes(dict_contacts=base_dict) if binary else create_indexes(dict_contacts=base_dict)
+
+    if snapshot and (loaded is None or loaded[1] is None and indexes is not None):
+        write_snapshot(path_to_file_dbase=path_to_file_dbase, key=key, base_dict=base_dict, indexes=indexes)
+
+
+    if with_indexes:
+        return base_dict, path_to_file_dbase, indexes
+
+    return base_dict, path_to_file_dbase
+
+
+def create_cash_names(dict_contacts: dict) -> NamesIndex:
+    return NamesIndex(dict_contacts=dict_contacts)
+
+
+@decorator_metrics('index_build')
+def create_indexes(dict_contacts: dict) -> tuple:
+    """indexes for search by prefix of name, part of name and prefix of phone number,
+    and order of names for pages of contact book"""
+    return (create_cash_names(dict_contacts=dict_contacts),
+            InfixIndex(dict_contacts=dict_contacts),
+            PhoneIndex(dict_contacts=dict_contacts),
+            OrderIndex(dict_contacts=dict_contacts))
+
+
+class LazyIndex:
+    """Index, which is built from contact book at first search (not at open of contact book).
+    Changes before it are skipped: index is built from contact book with them"""
+
+    __slots__ = ('__index_class',
+                 '__dict_contacts',
+                 '__index',
+                 )
+
+    def __init__(self, index_class, dict_contacts: dict):
+        self.__index_class = index_class
+        self.__dict_contacts = dict_contacts
+        self.__index = None
+
+    @property
+    def index(self):
+        if self.__index is None:
+            self.__index = self.__index_class(dict_contacts=self.__dict_contacts)
+        return self.__index
+
+    def __getattr__(self, name: str):
+        return getattr(self.index, name)
+
+    def __len__(self):
+        return len(self.__dict_contacts)
+
+    def add(self, contact: Contact) -> None:
+        if self.__index is not None:
+            self.__index.add(contact)
+
+    def add_batch(self, contacts: list) -> None:
+        if self.__index is not None:
+            self.__index.add_batch(contacts)
+
+    def remove(self, contact: Contact) -> None:
+        if self.__index is not None:
+            self.__index.remove(contact)
+
+
+def create_lazy_indexes(dict_contacts: dict) -> tuple:
+    """indexes as create_indexes, every of them is built at first search"""
+    return tuple(LazyIndex(index_class=index_class, dict_contacts=dict_contacts)
+                 for index_class in (NamesIndex, InfixIndex, PhoneIndex, OrderIndex))
+
+
+def add_contact(dict_contacts: dict,
+                contact: Contact,
+                hooks: tuple = ()) -> None:
+    """add contact to contact book and to all indexes (hooks)"""
+    dict_contacts[contact.phone_number] = contact
+    for hook in hooks:
+        hook.add(contact)
+
+
+def add_contacts(dict_contacts: dict,
+                 contacts: list,
+                 hooks: tuple = ()) -> None:
+    """add batch of contacts to contact book and to all indexes (hooks with add_batch or add)"""
+    for contact in contacts:
+        dict_contacts[contact.phone_number] = contact
+
+    add_contacts_to_hooks(contacts=contacts, hooks=hooks)
+
+
+def add_contacts_to_hooks(contacts: list, hooks: tuple) -> None:
+    """add batch of contacts (they are in contact book already) to indexes and other hooks"""
+    for hook in hooks:
+        add_batch = getattr(hook, 'add_batch', None)
+        if add_batch is not None:
+            add_batch(contacts)
+        else:
+            for contact in contacts:
+                hook.add(contact)
+
+
+def remove_contact(dict_contacts: dict,
+                   contact: Contact,
+                   hooks: tuple = ()) -> None:
+    """remove contact from contact book and from all indexes (hooks)"""
+    del dict_contacts[contact.phone_number]
+    for hook in hooks:
+        hook.remove(contact)
+
+
+def replace_contact(dict_contacts: dict,
+                    contact: Contact,
+                    new_contact: Contact,
+                    hooks: tuple = ()) -> None:
+    """replace contact in contact book and in all indexes (hooks)"""
+    remove_contact(dict_contacts=dict_contacts, contact=contact, hooks=hooks)
+    add_contact(dict_contacts=dict_contacts, contact=new_contact, hooks=hooks)
+
+
+# @decorator_args_kwargs
+@decorator_metrics('save')
+def full_upload_dbase(dbase_dict: dict,
+                      path_to_file_dbase: pathlib.Path,
+                      mark_print=None,
+                      version: int = None) -> None:
+    """write contact book to temp file with checksum footer and replace file dbase by it.
+    Without version it is the next version of file dbase (version of file never goes back).
+    Processes, which share file dbase, write it by SharedDbase (under lock)"""
+    if version is None:
+        version = read_dbase_version(path_to_file_dbase=path_to_file_dbase) + 1
+
+    cnt_rows: int = 0
+    len_dbase_dict: int = len(dbase_dict)
+    checksum: int = 0
+    batch: list = []
+
+    if mark_print is None:
+        mark_print = get_mark_print(len_obj=len_dbase_dict)
+
+    with open_file_atomic(path_to_file=path_to_file_dbase, mode='wb') as fb:
+        for _, contact in dbase_dict.items():
+            batch.append(f'{contact.format_to_dbase}\n')
+            cnt_rows += 1
+
+            if len(batch) >= 4096:
+                block = ''.join(batch).encode()
+                checksum = zlib.crc32(block, checksum)
+                fb.write(block)
+                batch.clear()
+
+            if (len_dbase_dict // mark_print) >= 2 and cnt_rows % mark_print == 0:
+                print(f'upload {cnt_rows} rows...')
+
+        block = ''.join(batch).encode()
+        checksum = zlib.crc32(block, checksum)
+        fb.write(block)
+        fb.write(DbaseFooter.footer(checksum=checksum, cnt_rows=cnt_rows, version=version))
+
+    if cnt_rows > 0:
+        print(f'total upload {cnt_rows} rows...')
+
+
+def read_dbase_version(path_to_file_dbase) -> int:
+    """version from footer of file dbase, 0 for absent file or file without version"""
+    try:
+        with open(path_to_file_dbase, 'rb') as fb:
+            size = fb.seek(0, os.SEEK_END)
+            fb.seek(max(size - 64, 0))
+            tail = fb.read()
+    except FileNotFoundError:
+        return 0
+    return DbaseFooter.version(footer=tail[tail.rfind(b'\n', 0, len(tail) - 1) + 1:])
+
+
+def get_path_to_file_journal(path_to_file_dbase, pid: int = None) -> pathlib.Path:
+    """journal of process: every process, which opens file dbase, writes own journal"""
+    return pathlib.Path(f'{path_to_file_dbase}.journal.{os.getpid() if pid is None else pid}')
+
+
+def get_paths_to_files_journal(path_to_file_dbase) -> list:
+    """journals of all processes (and journal of old versions without pid)"""
+    import glob
+
+    path_to_file_dbase = pathlib.Path(path_to_file_dbase)
+    return sorted(path_to_file_dbase.parent.glob(f'{glob.escape(path_to_file_dbase.name)}.journal*'))
+
+
+class Journal:
+    """Append-only journal of changes of contact book (it is hook for add_contact/remove_contact).
+    Records: "P;<contact in format of dbase>" - add or edit, "D;<phone number>" - remove.
+    Open journal is locked (fcntl) by its process: journal without lock is left by finished
+    or crashed process, it is folded into file dbase by next process (SharedDbase.recover_journals)"""
+
+    __slots__ = ('__path_to_file_journal',
+                 '__file_journal',
+                 '__offset_mark',
+                 )
+
+    def __init__(self, path_to_file_journal):
+        self.__path_to_file_journal = pathlib.Path(path_to_file_journal)
+        self.__cut_torn_record()
+        self.__file_journal = open(self.__path_to_file_journal, 'a')
+        self.__lock(file_obj=self.__file_journal)
+        self.__offset_mark = self.size()
+
+    @classmethod
+    def __lock(cls, file_obj, blocking: bool = True) -> bool:
+        import fcntl
+
+        try:
+            fcntl.flock(file_obj.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    @classmethod
+    def is_left(cls, path_to_file_journal) -> bool:
+        """journal isn't locked: its process is finished"""
+        try:
+            with open(path_to_file_journal, 'rb') as fj:
+                return cls.__lock(file_obj=fj, blocking=False)
+        except FileNotFoundError:
+            return False
+
+    def __cut_torn_record(self) -> None:
+        """last record without end of line (crash in write) is dropped, new records go after it"""
+        if not self.__path_to_file_journal.exists():
+            return
+
+        with open(self.__path_to_file_journal, 'rb+') as fj:
+            size = fj.seek(0, os.SEEK_END)
+            offset = size
+            while offset > 0:
+                start = max(0, offset - 4096)
+                fj.seek(start)
+                cut = fj.read(offset - start).rfind(b'\n')
+                if cut >= 0:
+                    offset = start + cut + 1
                     break
+                offset = start
 
-                if action == 4:
-                    try:
-                        contact = find_contact_by_phone(dict_contacts=contacts,
-                                                        phone_number=input('Enter phone number for remove>> '))
-                        if contact is None:
-                            raise ContactNotFound
-                        else:
-                            print(f'This contact {str(contact)} will be deleted!')
-                            del contacts[contact.phone_number]
-                            contacts_change = True
-                            if input('Repeat remove? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                                break
-                    except ContactNotFound:
-                        if input('Sorry, contact not found. Repeat?'
-                                 '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                            break
-
-                if action == 5:
-                    try:
-                        contact = find_contact_by_phone(dict_contacts=contacts,
-                                                        phone_number=input('Enter phone number for edit>> '))
-                        if contact is None:
-                            raise ContactNotFound
-                        else:
-                            contact = edit_contact(contact=contact)
-                            contacts[contact.phone_number] = contact
-                            contacts_change = True
+            if offset < size:
+                fj.truncate(offset)
+
+    @property
+    def path_to_file_journal(self) -> pathlib.Path:
+        return self.__path_to_file_journal
+
+    def size(self) -> int:
+        self.__file_journal.flush()
+        return os.path.getsize(self.__path_to_file_journal)
+
+    def __write(self, rec: str) -> None:
+        self.__file_journal.write(rec)
+        self.__file_journal.flush()
+        Durability.sync(file_obj=self.__file_journal)
+
+    def add(self, contact: Contact) -> None:
+        self.__write(f'P;{contact.format_to_dbase}\n')
+
+    def add_batch(self, contacts: list) -> None:
+        self.__write(''.join(f'P;{contact.format_to_dbase}\n' for contact in contacts))
+
+    def remove(self, contact: Contact) -> None:
+        self.__write(f'D;{contact.phone_number}\n')
+
+    def mark(self) -> None:
+        """remember end of journal, rollback returns journal to this place"""
+        self.__offset_mark = self.size()
+
+    def rollback(self) -> None:
+        """drop records after mark (changes, that user didn't want to save)"""
+        self.__file_journal.flush()
+        os.truncate(self.__path_to_file_journal, self.__offset_mark)
+
+    def clear(self) -> None:
+        self.__file_journal.flush()
+        os.truncate(self.__path_to_file_journal, 0)
+        self.__offset_mark = 0
+
+    def close(self) -> None:
+        """empty journal is removed, not empty one is folded into file dbase by next process"""
+        if self.size() == 0:
+            self.__path_to_file_journal.unlink(missing_ok=True)
+        self.__file_journal.close()
+
+    @classmethod
+    def replay(cls,
+               dict_contacts: dict,
+               path_to_file_journal,
+               hooks: tuple = ()) -> int:
+        """apply journal to contact book, return count of applied records"""
+        if not pathlib.Path(path_to_file_journal).exists():
+            return 0
+
+        sep = get_tuning_value('sep_in_dbase')
+        cnt_rows: int = 0
+
+        with open(path_to_file_journal, 'r') as fj:
+            for rec in fj:
+                if not rec.endswith('\n'):
+                    break  # record was not written to end (crash)
+
+                rec = rec.rstrip('\n').split(sep)
+                contact = dict_contacts.get(rec[1])
+
+                if rec[0] == 'P':
+                    new_contact = Contact(phone_number=rec[1],
+                                          contact_name=rec[2],
+                                          date_time_creation_contact=parse_date_time_creation(rec[3]),
+                                          validate=False)
+                    if contact is None:
+                        add_contact(dict_contacts=dict_contacts, contact=new_contact, hooks=hooks)
+                    else:
+                        replace_contact(dict_contacts=dict_contacts,
+                                        contact=contact,
+                                        new_contact=new_contact,
+                                        hooks=hooks)
+                elif rec[0] == 'D' and contact is not None:
+                    remove_contact(dict_contacts=dict_contacts, contact=contact, hooks=hooks)
+
+                cnt_rows += 1
+
+        if cnt_rows > 0:
+            print(f'total replay {cnt_rows} rows of journal')
+
+        return cnt_rows
+
+
+def compact_journal(dbase_dict: dict,
+                    path_to_file_dbase: pathlib.Path,
+                    journal: Journal,
+                    force: bool = False,
+                    rewrite: bool = False) -> bool:
+    """fold journal into file dbase, if journal is bigger then tuning journal_max_size (force - any
+    not empty journal). Journal is applied to the last version of file dbase under lock, so changes of other
+    processes are kept. rewrite - contact book was replaced (restore), file dbase is replaced by dbase_dict"""
+    size = journal.size()
+    if not rewrite and (size == 0 or not force and size <= get_tuning_value('journal_max_size')):
+        return False
+
+    shared = SharedDbase(path_to_file_dbase=path_to_file_dbase)
+    if rewrite:
+        shared.replace(contacts=dbase_dict, journal=journal)
+    else:
+        shared.apply_journal(journal=journal)
+    return True
 
-                            if input('Repeat edit? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                                break
 
-                    except ContactNotFound:
-                        if input('Sorry, contact not found. Repeat?'
-                                 '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
-                            break
-
-                if action in (6, 9):
-                    format_of_backup = {
-                                          6:'json',
-                                          9:'pickle'
-                                        }
-                    path_to_file = full_backup_dbase(
-                                                      dbase_dict=contacts,
-                                                      format_of_backup=format_of_backup.get(action)
-                                                     )
-                    input(f'Backup done... create file: {path_to_file}')
+def write_backup_json(file_backup, batches) -> None:
+    """{"<phone number>": {contact}, ...} - the same structure as before, but compact and by batches"""
+    encoder = json.JSONEncoder(separators=(',', ':'))
+    sep = '{'
+    for batch in batches:
+        file_backup.write(sep)
+        file_backup.write(',\n'.join(f'{encoder.encode(phone_number)}:{encoder.encode(contact)}'
+                                     for phone_number, contact in batch.items()))
+        sep = ',\n'
+    file_backup.write('}\n' if sep != '{' else '{}\n')
+
+
+def write_backup_ndjson(file_backup, batches) -> None:
+    """one contact (json object) on line"""
+    encoder = json.JSONEncoder(separators=(',', ':'))
+    for batch in batches:
+        file_backup.write(''.join(f'{encoder.encode(contact)}\n' for contact in batch.values()))
+
+
+def write_backup_pickle(file_backup, batches) -> None:
+    """stream of pickled dicts (batches), reader loads them one by one up to end of file"""
+    import pickle
+
+    for batch in batches:
+        pickle.dump(batch, file_backup, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_backup_json(file_backup, chunk_size: int = None):
+    """generator of contacts (dict) from json backup {"<phone number>": {contact}, ...},
+    file is parsed by chunks, member by member"""
+    if chunk_size is None:
+        chunk_size = get_tuning_value('chunk_size')
+
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def read_more():
+        nonlocal buf, pos, eof
+        chunk = file_backup.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def next_symbol() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                raise json.JSONDecodeError('Unexpected end of backup', buf, pos)
+            read_more()
+
+    def next_value():
+        nonlocal pos
+        next_symbol()
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buf, pos)
+                return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more()
+
+    if next_symbol() != '{':
+        raise json.JSONDecodeError('Backup is not json object', buf, pos)
+    pos += 1
+
+    while True:
+        symbol = next_symbol()
+        if symbol == '}':
+            return
+        if symbol == ',':
+            pos += 1
+            continue
+
+        next_value()  # phone number (key), it is in contact too
+        if next_symbol() != ':':
+            raise json.JSONDecodeError('Expecting ":"', buf, pos)
+        pos += 1
+        yield next_value()
+
+
+def read_backup_ndjson(file_backup):
+    for rec in file_backup:
+        if rec.strip():
+            yield json.loads(rec)
+
+
+def read_backup_pickle(file_backup):
+    import pickle
+
+    while True:
+        try:
+            batch = pickle.load(file_backup)
+        except EOFError:
+            return
+        yield from batch.values()
+
+
+def open_codec_stream(file_obj, mode: str, codec: str):
+    """stream of compression (gz, bz2, xz) over binary file, level of compression is tuning"""
+    level = get_tuning_value('backup_compress_levels')[codec]
+    writing = 'w' in mode
+
+    if codec == 'gz':
+        import gzip
+        return gzip.GzipFile(fileobj=file_obj, mode=mode, compresslevel=level)
+    if codec == 'bz2':
+        import bz2
+        return bz2.BZ2File(file_obj, mode=mode, compresslevel=level)
+    if codec == 'xz':
+        import lzma
+        return lzma.LZMAFile(file_obj, mode=mode, preset=level if writing else None)
+
+    raise UnknownFormatOfBackupError
+
+
+@contextlib.contextmanager
+def open_backup_stream(file_obj, mode: str, codec: str = None):
+    """stream of backup over binary file: codec of compression (if any) and text layer for text formats.
+    file_obj isn't closed, it is owner's work"""
+    mode_binary = f'{mode.replace("b", "")}b'
+    stream = file_obj if codec is None else open_codec_stream(file_obj=file_obj, mode=mode_binary, codec=codec)
+    stream_text = None if 'b' in mode else io.TextIOWrapper(stream)
+
+    try:
+        yield stream if stream_text is None else stream_text
+    finally:
+        if stream_text is not None:
+            stream_text.flush()
+            stream_text.detach()
+        if stream is not file_obj:
+            stream.close()  # end of compressed stream is written here
+
+
+def get_backup_formats() -> dict:
+    """format of backup -> (extension of file, mode of file, writer, reader, codec of compression).
+    Every format has compressed variants: json.gz, ndjson.bz2, pickle.xz..."""
+    formats_of_backup = {
+                          'json': ('json', 'w', write_backup_json, read_backup_json, None),
+                          'ndjson': ('ndjson', 'w', write_backup_ndjson, read_backup_ndjson, None),
+                          'pickle': ('pickle', 'wb', write_backup_pickle, read_backup_pickle, None),
+                        }
+
+    for format_of_backup, (extension_file, mode_file, writer, reader, _) in tuple(formats_of_backup.items()):
+        for codec in ('gz', 'bz2', 'xz'):
+            formats_of_backup[f'{format_of_backup}.{codec}'] = (f'{extension_file}.{codec}', mode_file,
+                                                                writer, reader, codec)
+
+    return formats_of_backup
+
+
+def get_format_of_backup(path_to_file_backup) -> str:
+    """format of backup by extension of file"""
+    formats_of_backup = get_backup_formats()
+    name = pathlib.Path(path_to_file_backup).name.lower()
+
+    try:
+        for format_of_backup, (extension_file, *_) in formats_of_backup.items():
+            if name.endswith(f'.{extension_file}'):
+                return format_of_backup
+        raise UnknownFormatOfBackupError
+    except UnknownFormatOfBackupError:
+        print(UnknownFormatOfBackupError.message())
+        raise
+
+
+def iter_backup_batches(dbase_dict: dict,
+                        mark_print=None,
+                        batch_size: int = None):
+    """generator of batches (dict phone number -> dict of contact) for backup"""
+    if batch_size is None:
+        batch_size = get_tuning_value('backup_batch_size')
+
+    cnt_rows = 0
+    len_dbase_dict = len(dbase_dict)
+    if mark_print is None:
+        mark_print = get_mark_print(len_obj=len_dbase_dict)
+
+    batch = {}
+    for _, contact in dbase_dict.items():
+        batch.update(contact.dict)
+        cnt_rows += 1
+        if (len_dbase_dict // mark_print) >= 2 and cnt_rows % mark_print == 0:
+            print(f'backup {cnt_rows} rows...')
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = {}
+
+    if batch:
+        yield batch
+
+    if cnt_rows > 0:
+        print(f'total backup {cnt_rows} rows...')
+
+
+@decorator_metrics('backup')
+def full_backup_dbase(
+                        dbase_dict: dict,
+                        format_of_backup = 'json',
+                        path_to_file_dbase=None,
+                        mark_print=None
+                      ) -> pathlib.Path:
+    """backup is written to file record by record (batches), without building of all backup in memory"""
+    formats_of_backup = get_backup_formats()
+    format_of_backup = format_of_backup.lower()
+
+    try:
+        if format_of_backup not in formats_of_backup:
+            raise UnknownFormatOfBackupError
+    except UnknownFormatOfBackupError:
+        print(UnknownFormatOfBackupError.message())
+        raise
+
+    extension_file, mode_file, write_backup, _, codec = formats_of_backup[format_of_backup]
+
+    if not path_to_file_dbase:
+        path_to_file_dbase = pathlib.Path(
+                                           f'{get_tuning_value("path_to_dbase")}'
+                                           f'{os.sep}'
+                                           f'{get_tuning_value("file_name_of_backup")}.{extension_file}'
+                                          )
+
+    with open_file_atomic(path_to_file=path_to_file_dbase, mode='wb') as file_obj, \
+            open_backup_stream(file_obj=file_obj, mode=mode_file, codec=codec) as file_backup:
+        write_backup(file_backup, iter_backup_batches(dbase_dict=dbase_dict, mark_print=mark_print))
+
+    return path_to_file_dbase
+
+
+def validate_backup_records(records: list) -> tuple:
+    """contacts from batch of records of backup and count of not valid records"""
+    contacts = []
+    cash_date_time: dict = {}
+
+    rows = [(rec.get('phone_number'), rec.get('contact_name')) if isinstance(rec, dict) else (None, None)
+            for rec in records]
+    report = validate_contacts(rows=rows)
+    cnt_not_valid = report.cnt_invalid
+
+    for index in report.valid:
+        phone_number, contact_name = rows[index]
+        try:
+            str_date_time = records[index]['date_time_creation_contact']
+            date_time_creation_contact = cash_date_time.get(str_date_time)
+            if date_time_creation_contact is None:
+                date_time_creation_contact = parse_date_time_creation(str_date_time)
+                cash_date_time[str_date_time] = date_time_creation_contact
+
+        except (KeyError, TypeError, ValueError, AttributeError):
+            cnt_not_valid += 1
+            continue
+
+        contacts.append(Contact(phone_number=phone_number,
+                                contact_name=contact_name,
+                                date_time_creation_contact=date_time_creation_contact,
+                                validate=False))
+
+    return contacts, cnt_not_valid
+
+
+@decorator_metrics('restore')
+def full_restore_dbase(path_to_file_backup,
+                       format_of_backup: str = None,
+                       mark_print=None,
+                       contact_store: str = None) -> tuple:
+    """load contact book from backup (json, ndjson, pickle), records are read and validated by batches"""
+    if format_of_backup is None:
+        format_of_backup = get_format_of_backup(path_to_file_backup=path_to_file_backup)
+
+    if not pathlib.Path(path_to_file_backup).exists():
+        raise FileBaseNotFound
+
+    _, mode_file, _, read_backup, codec = get_backup_formats()[format_of_backup.lower()]
+
+    if contact_store is None:
+        contact_store = get_tuning_value('contact_store')
+    base_dict = ContactStore() if contact_store == 'columnar' else {}
+
+    if mark_print is None:
+        mark_print = get_tuning_value('backup_batch_size')
+    batch_size = get_tuning_value('backup_batch_size')
+
+    cnt_rows: int = 0
+    cnt_not_valid: int = 0
+    batch: list = []
+
+    def restore_batch():
+        nonlocal cnt_rows, cnt_not_valid
+        contacts, cnt = validate_backup_records(records=batch)
+        for contact in contacts:
+            base_dict[contact.phone_number] = contact
+        cnt_rows += len(contacts)
+        cnt_not_valid += cnt
+        batch.clear()
+
+        if cnt_rows // mark_print != (cnt_rows - len(contacts)) // mark_print:
+            print(f'restore {cnt_rows} rows...')
+
+    with open(path_to_file_backup, 'rb') as file_obj, \
+            open_backup_stream(file_obj=file_obj, mode=mode_file.replace('w', 'r'), codec=codec) as file_backup:
+        for rec in read_backup(file_backup):
+            batch.append(rec)
+            if len(batch) >= batch_size:
+                restore_batch()
+        restore_batch()
+
+    if cnt_not_valid > 0:
+        print(f'skipped {cnt_not_valid} not valid rows')
+    print(f'total restore {cnt_rows} rows')
+
+    return base_dict, path_to_file_backup
+
+
+def get_path_to_dir_backup_chain() -> pathlib.Path:
+    return pathlib.Path(f'{get_tuning_value("path_to_dbase")}{os.sep}'
+                        f'{get_tuning_value("file_name_of_backup")}.chain')
+
+
+class ChangeTracker:
+    """Phone numbers of contacts changed after last backup (it is hook for add_contact/remove_contact).
+    Phone numbers are appended to file, so changes of previous sessions are not lost.
+    Line "*" in file - full backup is needed (contact book was replaced)"""
+
+    __slots__ = ('__path_to_file_dirty',
+                 '__file_dirty',
+                 '__dirty',
+                 '__full_required',
+                 )
+
+    def __init__(self, path_to_file_dirty):
+        self.__path_to_file_dirty = pathlib.Path(path_to_file_dirty)
+        self.__dirty: set = set()
+        self.__full_required = False
+
+        if self.__path_to_file_dirty.exists():
+            with open(self.__path_to_file_dirty, 'r') as fd:
+                for rec in fd:
+                    rec = rec.rstrip('\n')
+                    if rec == '*':
+                        self.__full_required = True
+                    elif rec:
+                        self.__dirty.add(rec)
+
+        self.__file_dirty = open(self.__path_to_file_dirty, 'a')
+
+    @property
+    def dirty(self) -> set:
+        return self.__dirty
+
+    @property
+    def full_required(self) -> bool:
+        return self.__full_required
+
+    def __write(self, rec: str) -> None:
+        self.__file_dirty.write(f'{rec}\n')
+        self.__file_dirty.flush()
+
+    def add(self, contact: Contact) -> None:
+        if contact.phone_number not in self.__dirty:
+            self.__dirty.add(contact.phone_number)
+            self.__write(contact.phone_number)
+
+    def add_batch(self, contacts: list) -> None:
+        phones = [contact.phone_number for contact in contacts if contact.phone_number not in self.__dirty]
+        if phones:
+            self.__dirty.update(phones)
+            self.__write('\n'.join(phones))
+
+    def remove(self, contact: Contact) -> None:
+        self.add(contact)
+
+    def require_full(self) -> None:
+        self.__full_required = True
+        self.__write('*')
+
+    def clear(self) -> None:
+        self.__dirty.clear()
+        self.__full_required = False
+        self.__file_dirty.flush()
+        os.truncate(self.__path_to_file_dirty, 0)
+
+    def close(self) -> None:
+        self.__file_dirty.close()
+
+
+def load_backup_manifest(path_to_dir_chain) -> dict:
+    """manifest of chain of backups: {"backups": [{"file", "type" (full/delta), "created", "rows"}, ...]}"""
+    path_to_file_manifest = pathlib.Path(path_to_dir_chain) / 'manifest.json'
+    if not path_to_file_manifest.exists():
+        return {'backups': []}
+
+    with open(path_to_file_manifest, 'r') as fm:
+        return json.load(fm)
+
+
+@decorator_metrics('backup_incremental')
+def incremental_backup_dbase(dbase_dict: dict,
+                             tracker: ChangeTracker,
+                             path_to_dir_chain=None,
+                             full: bool = False) -> pathlib.Path:
+    """Backup to chain: full backup (ndjson) and after it deltas with changed contacts only.
+    Removed contact is written to delta as {"phone_number": ..., "deleted": true}"""
+    if path_to_dir_chain is None:
+        path_to_dir_chain = get_path_to_dir_backup_chain()
+    path_to_dir_chain = pathlib.Path(path_to_dir_chain)
+    path_to_dir_chain.mkdir(exist_ok=True)
+
+    manifest = load_backup_manifest(path_to_dir_chain=path_to_dir_chain)
+    backups = manifest['backups']
+
+    full = (full or tracker.full_required or not backups
+            or len(backups) > get_tuning_value('backup_chain_max_deltas'))
+
+    num = int(backups[-1]['file'].split('-')[0]) + 1 if backups else 1
+    type_of_backup = 'full' if full else 'delta'
+    path_to_file_backup = path_to_dir_chain / f'{num:06d}-{type_of_backup}.ndjson'
+
+    if full:
+        full_backup_dbase(dbase_dict=dbase_dict,
+                          format_of_backup='ndjson',
+                          path_to_file_dbase=path_to_file_backup)
+        cnt_rows = len(dbase_dict)
+        old_backups, backups = backups, []
+    else:
+        encoder = json.JSONEncoder(separators=(',', ':'))
+        cnt_rows = 0
+        with open_file_atomic(path_to_file=path_to_file_backup, mode='w') as file_backup:
+            for phone_number in sorted(tracker.dirty):
+                contact = dbase_dict.get(phone_number)
+                if contact is None:
+                    rec = {'phone_number': phone_number, 'deleted': True}
+                else:
+                    rec = contact.dict[phone_number]
+                file_backup.write(f'{encoder.encode(rec)}\n')
+                cnt_rows += 1
+        old_backups = []
+
+    backups.append({'file': path_to_file_backup.name,
+                    'type': type_of_backup,
+                    'created': datetime.datetime.now().strftime(Contact.mask_date_time_creation()),
+                    'rows': cnt_rows})
+
+    with open_file_atomic(path_to_file=path_to_dir_chain / 'manifest.json', mode='w') as fm:
+        json.dump({'backups': backups}, fm, indent=4)
+
+    # previous chain is not needed after new full backup
+    for backup in old_backups:
+        with contextlib.suppress(OSError):
+            os.remove(path_to_dir_chain / backup['file'])
+
+    tracker.clear()
+    print(f'{type_of_backup} backup: {cnt_rows} rows')
+
+    return path_to_file_backup
+
+
+def restore_backup_chain(path_to_dir_chain=None,
+                         contact_store: str = None) -> tuple:
+    """load contact book from chain of backups: full backup and all deltas after it"""
+    if path_to_dir_chain is None:
+        path_to_dir_chain = get_path_to_dir_backup_chain()
+    path_to_dir_chain = pathlib.Path(path_to_dir_chain)
+
+    backups = load_backup_manifest(path_to_dir_chain=path_to_dir_chain)['backups']
+    if not backups or backups[0]['type'] != 'full':
+        raise FileBaseNotFound
+
+    base_dict, _ = full_restore_dbase(path_to_file_backup=path_to_dir_chain / backups[0]['file'],
+                                      format_of_backup='ndjson',
+                                      contact_store=contact_store)
+
+    for backup in backups[1:]:
+        with open(path_to_dir_chain / backup['file'], 'r') as file_backup:
+            records = []
+            for rec in read_backup_ndjson(file_backup):
+                # phone number is once in delta, so order of removing and batch is not important
+                if rec.get('deleted'):
+                    if rec['phone_number'] in base_dict:
+                        del base_dict[rec['phone_number']]
+                    continue
+
+                records.append(rec)
+                if len(records) >= get_tuning_value('backup_batch_size'):
+                    for contact in validate_backup_records(records=records)[0]:
+                        base_dict[contact.phone_number] = contact
+                    records.clear()
+
+            for contact in validate_backup_records(records=records)[0]:
+                base_dict[contact.phone_number] = contact
+
+        print(f'restore delta {backup["file"]}: {backup["rows"]} rows')
+
+    return base_dict, path_to_dir_chain
+
+
+phone_sym_table: dict = str.maketrans('', '', ' -().\t\xa0')
+
+
+def clean_phone(phone_number: str) -> str:
+    """phone number from export of other programs: without spaces, dashes, dots and brackets"""
+    return phone_number.translate(phone_sym_table) if isinstance(phone_number, str) else phone_number
+
+
+def read_import_csv(file_import, batch_size: int, delimiter: str = ','):
+    """generator of batches of (phone number, contact name) from csv. First row is header if it has name of
+    column of phone number (phone, phone_number, tel...), else columns are: phone number, contact name"""
+    import csv
+
+    columns_phone = ('phone', 'phone_number', 'phone number', 'tel', 'telephone', 'mobile')
+    columns_name = ('name', 'contact_name', 'contact name', 'full name', 'fn')
+
+    reader = csv.reader(file_import, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    header_lower = [column.strip().lower() for column in header]
+    col_phone, col_name = 0, 1
+    if any(column in columns_phone for column in header_lower):
+        col_phone = next(i for i, column in enumerate(header_lower) if column in columns_phone)
+        col_name = next((i for i, column in enumerate(header_lower) if column in columns_name), 1 - col_phone)
+    else:
+        reader = itertools.chain((header,), reader)
+
+    cnt_columns = max(col_phone, col_name) + 1
+    while True:
+        rows = list(itertools.islice(reader, batch_size))
+        if not rows:
+            return
+
+        if all(len(row) >= cnt_columns for row in rows):
+            yield [(row[col_phone].translate(phone_sym_table), row[col_name].strip()) for row in rows]
+        else:
+            yield [(clean_phone(row[col_phone]) if col_phone < len(row) else None,
+                    row[col_name].strip() if col_name < len(row) else None)
+                   for row in rows if row]
+
+
+def read_import_vcard(file_import, batch_size: int):
+    """generator of batches of (phone number, contact name) from vCard: FN (or N) and first TEL of every card"""
+    phone_number = contact_name = name_n = None
+    prev = None
+    batch = []
+
+    def properties():
+        # long lines of vCard are folded: next line begins with space or tab
+        nonlocal prev
+        for line in file_import:
+            line = line.rstrip('\r\n')
+            if line[:1] in (' ', '\t') and prev is not None:
+                prev += line[1:]
+                continue
+            if prev is not None:
+                yield prev
+            prev = line
+        if prev is not None:
+            yield prev
+
+    for line in properties():
+        name, _, value = line.partition(':')
+        name = name.split(';', 1)[0].rsplit('.', 1)[-1].upper()  # "item1.TEL;TYPE=CELL" -> TEL
+
+        if name == 'BEGIN':
+            phone_number = contact_name = name_n = None
+        elif name == 'TEL' and phone_number is None:
+            phone_number = clean_phone(value.removeprefix('tel:'))
+        elif name == 'FN':
+            contact_name = value.strip()
+        elif name == 'N':
+            family, _, rest = value.partition(';')
+            given = rest.split(';', 1)[0]
+            name_n = ' '.join(i for i in (given.strip(), family.strip()) if i)
+        elif name == 'END':
+            batch.append((phone_number, contact_name or name_n))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def get_import_formats() -> dict:
+    """format of import (extension of file) -> reader of batches of (phone number, contact name)"""
+    return {
+             'csv': read_import_csv,
+             'vcf': read_import_vcard,
+             'vcard': read_import_vcard,
+           }
+
+
+def import_contacts(dbase_dict: dict,
+                    path_to_file_import,
+                    format_of_import: str = None,
+                    hooks: tuple = (),
+                    batch_size: int = None,
+                    mark_print: int = None) -> dict:
+    """bulk import of contacts from csv or vCard: file is read as stream of batches, every batch is validated,
+    contacts with phone numbers which are in contact book (or before in file) are skipped.
+    New contacts are added to contact book at once, to indexes (hooks) - by big batches
+    (batch grows with contact book, so indexes are rebuilt few times).
+    Return report: read, added, duplicates, invalid (by reasons)"""
+    if format_of_import is None:
+        format_of_import = pathlib.Path(path_to_file_import).suffix.lstrip('.').lower()
+
+    read_import = get_import_formats().get(format_of_import)
+    try:
+        if read_import is None:
+            raise UnknownFormatOfBackupError
+    except UnknownFormatOfBackupError:
+        print(UnknownFormatOfBackupError.message())
+        raise
+
+    if not pathlib.Path(path_to_file_import).exists():
+        raise FileBaseNotFound
+
+    if batch_size is None:
+        batch_size = get_tuning_value('backup_batch_size')
+    if mark_print is None:
+        mark_print = get_tuning_value('import_mark_print')
+
+    date_time_creation_contact = datetime.datetime.now().replace(microsecond=0)
+    report = {'read': 0, 'added': 0, 'duplicates': 0, 'invalid': {}}
+    pending: list = []  # contacts, which are in contact book, but not in indexes yet
+    seen: set = set()
+    seen_add = seen.add
+
+    try:
+        with open(path_to_file_import, 'r', newline='', encoding='utf-8-sig') as file_import:
+            for batch in read_import(file_import, batch_size=batch_size):
+                validation = validate_contacts(rows=batch)
+                if validation.invalid:
+                    for reason, indexes in validation.invalid.items():
+                        report['invalid'][reason] = report['invalid'].get(reason, 0) + len(indexes)
+                    batch = [batch[index] for index in validation.valid]
+
+                # seen_add returns None: phone number is remembered and contact is created
+                contacts = [Contact(phone_number=phone_number,
+                                    contact_name=contact_name,
+                                    date_time_creation_contact=date_time_creation_contact,
+                                    validate=False)
+                            for phone_number, contact_name in batch
+                            if not (phone_number in seen or phone_number in dbase_dict or seen_add(phone_number))]
+
+                add_contacts(dict_contacts=dbase_dict, contacts=contacts)
+                pending.extend(contacts)
+                if len(pending) >= max(batch_size, len(dbase_dict) // 2):
+                    add_contacts_to_hooks(contacts=pending, hooks=hooks)
+                    pending = []
+
+                cnt_read = report['read'] + validation.cnt_rows
+                report['duplicates'] += len(batch) - len(contacts)
+                report['added'] += len(contacts)
+                if cnt_read // mark_print != report['read'] // mark_print:
+                    print(f'import {cnt_read} rows, added {report["added"]}...')
+                report['read'] = cnt_read
+    finally:
+        # contacts are in contact book already, they must reach indexes and journal also on error of reading
+        add_contacts_to_hooks(contacts=pending, hooks=hooks)
+
+    print(f'total import {report["read"]} rows: added {report["added"]}, duplicates {report["duplicates"]}, '
+          f'not valid {sum(report["invalid"].values())}')
+
+    return report
+
+
+class SharedDbase:
+    """File dbase shared by many processes. Writers take exclusive advisory lock (fcntl) of
+    <file dbase>.lock and write only if version of file (footer) is the version they read,
+    else VersionConflict. Readers don't take lock: file is replaced by rename, so reader
+    checks that file (inode) wasn't replaced during reading, else reads again.
+    Binary file dbase has no version (it is always 0)"""
+
+    def __init__(self, path_to_file_dbase, read_retries: int = 5):
+        self.__path_to_file_dbase = pathlib.Path(path_to_file_dbase)
+        self.__path_to_file_lock = pathlib.Path(f'{path_to_file_dbase}.lock')
+        self.__read_retries = read_retries
+
+        if not self.__path_to_file_dbase.exists():
+            with self.lock():
+                if not self.__path_to_file_dbase.exists():
+                    full_upload_dbase(dbase_dict={}, path_to_file_dbase=self.__path_to_file_dbase, version=0)
+
+    @contextlib.contextmanager
+    def lock(self, shared: bool = False):
+        import fcntl
+
+        with open(self.__path_to_file_lock, 'a') as file_lock:
+            fcntl.flock(file_lock.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file_lock.fileno(), fcntl.LOCK_UN)
+
+    def version(self) -> int:
+        return read_dbase_version(path_to_file_dbase=self.__path_to_file_dbase)
+
+    def __read(self) -> tuple:
+        if MappedContacts.is_binary_dbase(path_to_file_dbase=self.__path_to_file_dbase):
+            return MappedContacts(path_to_file_dbase=self.__path_to_file_dbase), 0
+
+        contacts = {contact.phone_number: contact
+                    for contact in iter_download_dbase(path_to_file_dbase=self.__path_to_file_dbase,
+                                                       mark_print=1 << 62)}
+        return contacts, self.version()
+
+    def __upload(self, contacts: dict, version: int) -> None:
+        if isinstance(contacts, MappedContacts):
+            write_binary_dbase(dbase_dict=contacts, path_to_file_dbase=self.__path_to_file_dbase)
+        else:
+            full_upload_dbase(dbase_dict=contacts, path_to_file_dbase=self.__path_to_file_dbase,
+                              mark_print=1 << 62, version=version)
+
+    def read(self) -> tuple:
+        """(contacts, version) - consistent snapshot of file dbase"""
+        for _ in range(self.__read_retries):
+            stat = os.stat(self.__path_to_file_dbase)
+            try:
+                contacts, version = self.__read()
+            except (FileBaseCorrupted, FileNotFoundError):
+                continue
+            stat_after = os.stat(self.__path_to_file_dbase)
+            if (stat.st_ino, stat.st_mtime_ns) == (stat_after.st_ino, stat_after.st_mtime_ns):
+                return contacts, version
+
+        # file is changed too often: read under shared lock (writers wait)
+        with self.lock(shared=True):
+            return self.__read()
+
+    def write(self, contacts: dict, version: int) -> int:
+        """write contacts, if file dbase has version (it was read by this process), return new version"""
+        with self.lock():
+            try:
+                if self.version() != version:
+                    raise VersionConflict
+            except VersionConflict:
+                print(VersionConflict.message())
+                raise
+
+            self.__upload(contacts=contacts, version=version + 1)
+        return version + 1
+
+    def replace(self, contacts: dict, journal: Journal = None) -> int:
+        """write contacts over any version of file dbase (contact book is restored from backup),
+        journal of process is cleared (its changes are in contacts), return new version"""
+        with self.lock():
+            version = self.version() + 1
+            self.__upload(contacts=contacts, version=version)
+            if journal is not None:
+                journal.clear()
+        return version
+
+    def apply(self, put: list = (), delete: list = ()) -> int:
+        """put contacts and delete phone numbers on last version of file dbase (under lock,
+        so changes of other processes aren't lost), return new version"""
+        with self.lock():
+            contacts, version = self.__read()
+            for contact in put:
+                contacts[contact.phone_number] = contact
+            for phone_number in delete:
+                contacts.pop(phone_number, None)
+
+            self.__upload(contacts=contacts, version=version + 1)
+        return version + 1
+
+    def __apply_journals(self, paths_to_files_journal: list) -> int:
+        contacts, version = self.__read()
+        try:
+            for path_to_file_journal in paths_to_files_journal:
+                Journal.replay(dict_contacts=contacts, path_to_file_journal=path_to_file_journal)
+            self.__upload(contacts=contacts, version=version + 1)
+        finally:
+            if isinstance(contacts, MappedContacts):
+                contacts.close()
+        return version + 1
+
+    def apply_journal(self, journal: Journal) -> int:
+        """fold journal of process into the last version of file dbase, return new version"""
+        with self.lock():
+            version = self.__apply_journals(paths_to_files_journal=(journal.path_to_file_journal,))
+            journal.clear()
+        return version
+
+    def recover_journals(self) -> int:
+        """fold journals of finished processes into file dbase (journals of working processes
+        are locked by them), return count of folded journals"""
+        if not any(map(Journal.is_left, get_paths_to_files_journal(self.__path_to_file_dbase))):
+            return 0
+
+        with self.lock():
+            paths = [path for path in get_paths_to_files_journal(self.__path_to_file_dbase) if Journal.is_left(path)]
+            if any(path.stat().st_size for path in paths):
+                self.__apply_journals(paths_to_files_journal=paths)
+            for path in paths:
+                path.unlink()
+        return len(paths)
+
+
+class StorageEngine:
+    """Interface of storage of contact book: load, get, put, delete, scan and search.
+    Search criteria: name_prefix, fragment (part of name), phone_prefix"""
+
+    def load(self) -> dict:
+        """all contacts (phone number -> Contact)"""
+        return {contact.phone_number: contact for contact in self.scan()}
+
+    def get(self, phone_number: str):
+        raise NotImplementedError
+
+    def put(self, contact: Contact) -> None:
+        """add or replace contact"""
+        raise NotImplementedError
+
+    def put_batch(self, contacts: list) -> None:
+        for contact in contacts:
+            self.put(contact)
+
+    def delete(self, phone_number: str) -> bool:
+        raise NotImplementedError
+
+    def scan(self):
+        """generator of all contacts"""
+        raise NotImplementedError
+
+    def search(self, name_prefix: str = None, fragment: str = None, phone_prefix: str = None,
+               limit: int = None) -> list:
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class TextFileEngine(StorageEngine):
+    """File dbase (';' separated rows) loaded to memory with indexes, changes are written to journal,
+    flush folds journal into file dbase"""
+
+    def __init__(self, path_to_file_dbase, contact_store: str = None):
+        self.__path_to_file_dbase = pathlib.Path(path_to_file_dbase)
+        self.__contacts, _, indexes = full_download_dbase(path_to_file_dbase=self.__path_to_file_dbase,
+                                                          contact_store=contact_store,
+                                                          with_indexes=True)
+        self.__names, self.__infix, self.__phones, _ = indexes
+        self.__journal = Journal(path_to_file_journal=get_path_to_file_journal(self.__path_to_file_dbase))
+        self.__hooks = (*indexes, self.__journal)
+
+    def load(self) -> dict:
+        return self.__contacts
+
+    def get(self, phone_number: str):
+        return self.__contacts.get(phone_number)
+
+    def put(self, contact: Contact) -> None:
+        old_contact = self.__contacts.get(contact.phone_number)
+        if old_contact is None:
+            add_contact(dict_contacts=self.__contacts, contact=contact, hooks=self.__hooks)
+        else:
+            replace_contact(dict_contacts=self.__contacts, contact=old_contact, new_contact=contact,
+                            hooks=self.__hooks)
+
+    def put_batch(self, contacts: list) -> None:
+        # the last contact with phone number wins (as in sqlite), indexes must not get the others
+        contacts = {contact.phone_number: contact for contact in contacts}.values()
+        new_contacts = [contact for contact in contacts if contact.phone_number not in self.__contacts]
+        for contact in contacts:
+            if contact.phone_number in self.__contacts:
+                self.put(contact)
+        add_contacts(dict_contacts=self.__contacts, contacts=new_contacts, hooks=self.__hooks)
+
+    def delete(self, phone_number: str) -> bool:
+        contact = self.__contacts.get(phone_number)
+        if contact is None:
+            return False
+        remove_contact(dict_contacts=self.__contacts, contact=contact, hooks=self.__hooks)
+        return True
+
+    def scan(self):
+        return iter(self.__contacts.values())
+
+    def search(self, name_prefix: str = None, fragment: str = None, phone_prefix: str = None,
+               limit: int = None) -> list:
+        if name_prefix is not None:
+            phones = self.__names.find(name_prefix)
+        elif phone_prefix is not None:
+            phones = self.__phones.find(phone_prefix)
+        else:
+            phones = self.__infix.find(fragment, limit=limit)
+        return [self.__contacts[phone_number] for phone_number in itertools.islice(phones, limit)]
+
+    def __len__(self):
+        return len(self.__contacts)
+
+    def flush(self) -> None:
+        compact_journal(dbase_dict=self.__contacts,
+                        path_to_file_dbase=self.__path_to_file_dbase,
+                        journal=self.__journal,
+                        force=True)
+
+    def close(self) -> None:
+        self.flush()
+        self.__journal.close()
+
+
+class SqliteEngine(StorageEngine):
+    """Contact book in sqlite3 database (WAL): contacts aren't kept in memory, table has indexes on
+    phone number, normalized phone number and normalized name. Every put/delete is own transaction,
+    inside "with engine.batch():" all changes are one transaction"""
+
+    __synchronous = {'always': 'FULL', 'batch': 'NORMAL', 'none': 'OFF'}
+
+    def __init__(self, path_to_file_db):
+        import sqlite3
+
+        self.__connection = sqlite3.connect(path_to_file_db, isolation_level=None)
+        self.__in_batch = False
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(f'PRAGMA synchronous={self.__synchronous[get_tuning_value("durability")]}')
+        self.__connection.executescript('''
+            CREATE TABLE IF NOT EXISTS contacts (
+                phone_number TEXT PRIMARY KEY,
+                contact_name TEXT NOT NULL,
+                phone_key TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                seconds INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS contacts_phone_key ON contacts (phone_key);
+            CREATE INDEX IF NOT EXISTS contacts_name_key ON contacts (name_key);
+        ''')
+
+    @classmethod
+    def __row(cls, contact: Contact) -> tuple:
+        return (contact.phone_number,
+                contact.contact_name,
+                normalize_phone(contact.phone_number),
+                normalize_name(contact.contact_name),
+                ContactStore.seconds(contact.date_time_creation_contact))
+
+    @classmethod
+    def __contact(cls, row: tuple) -> Contact:
+        return Contact(phone_number=row[0],
+                       contact_name=row[1],
+                       date_time_creation_contact=ContactStore.date_time(row[2]),
+                       validate=False)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """all changes inside are one transaction"""
+        if self.__in_batch:
+            yield self
+            return
+
+        self.__connection.execute('BEGIN')
+        self.__in_batch = True
+        try:
+            yield self
+        except BaseException:
+            self.__connection.execute('ROLLBACK')
+            raise
+        else:
+            self.__connection.execute('COMMIT')
+        finally:
+            self.__in_batch = False
+
+    def get(self, phone_number: str):
+        row = self.__connection.execute('SELECT phone_number, contact_name, seconds FROM contacts '
+                                        'WHERE phone_number = ?', (phone_number,)).fetchone()
+        return None if row is None else self.__contact(row)
+
+    def put(self, contact: Contact) -> None:
+        self.__connection.execute('INSERT OR REPLACE INTO contacts VALUES (?, ?, ?, ?, ?)', self.__row(contact))
+
+    def put_batch(self, contacts: list) -> None:
+        with self.batch():
+            self.__connection.executemany('INSERT OR REPLACE INTO contacts VALUES (?, ?, ?, ?, ?)',
+                                          map(self.__row, contacts))
+
+    def delete(self, phone_number: str) -> bool:
+        return self.__connection.execute('DELETE FROM contacts WHERE phone_number = ?',
+                                         (phone_number,)).rowcount > 0
+
+    def __select(self, where: str = '', params: tuple = (), limit: int = None):
+        sql = f'SELECT phone_number, contact_name, seconds FROM contacts {where}'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+
+        cursor = self.__connection.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(get_tuning_value('backup_batch_size'))
+            if not rows:
+                return
+            for row in rows:
+                yield self.__contact(row)
+
+    def scan(self):
+        return self.__select(where='ORDER BY phone_number')
+
+    def search(self, name_prefix: str = None, fragment: str = None, phone_prefix: str = None,
+               limit: int = None) -> list:
+        if name_prefix is not None:
+            key = normalize_name(name_prefix)
+            where, params = 'WHERE name_key >= ? AND name_key < ? ORDER BY name_key', (key, key + chr(0x10FFFF))
+        elif phone_prefix is not None:
+            key = normalize_phone(phone_prefix)
+            where, params = 'WHERE phone_key >= ? AND phone_key < ? ORDER BY phone_key', (key, key + chr(0x10FFFF))
+        else:
+            # part of name can't use index: instr over column of normalized names
+            where, params = 'WHERE instr(name_key, ?) > 0', (normalize_name(fragment),)
+        return list(self.__select(where=where, params=params, limit=limit))
+
+    def __len__(self):
+        return self.__connection.execute('SELECT count(*) FROM contacts').fetchone()[0]
+
+    def close(self) -> None:
+        self.__connection.close()
+
+
+def get_storage_engine(path_to_file, engine: str = None) -> StorageEngine:
+    """engine by name (tuning storage_engine) or by extension of file (.sqlite, .db - sqlite)"""
+    if engine is None:
+        engine = 'sqlite' if pathlib.Path(path_to_file).suffix in ('.sqlite', '.db') \
+            else get_tuning_value('storage_engine')
+
+    if engine == 'sqlite':
+        return SqliteEngine(path_to_file_db=path_to_file)
+    return TextFileEngine(path_to_file_dbase=path_to_file)
+
+
+class ContactBookServer:
+    """Contact book loaded once with indexes and served over line-delimited JSON (asyncio,
+    Unix socket or localhost TCP). Request: {"id": ..., "op": ..., ...}, response: {"id": ..., "ok": true,
+    "result": ...} or {"id": ..., "ok": false, "error": ...}. Requests of connection are handled in order,
+    client can send next requests without waiting of responses (pipelining), or many requests
+    in one: {"op": "batch", "requests": [...]}.
+    Operations: lookup (phone), prefix (name or phone), substring (name), add, edit (phone, name),
+    delete (phone), count. Without with_indexes indexes are built at first search"""
+
+    def __init__(self, path_to_file_dbase=None, with_indexes: bool = True):
+        loaded = full_download_dbase(path_to_file_dbase=path_to_file_dbase, with_indexes=with_indexes)
+        self.contacts, self.path_to_file_dbase = loaded[:2]
+        self.journal = Journal(path_to_file_journal=get_path_to_file_journal(self.path_to_file_dbase))
+        path_to_dir_chain = get_path_to_dir_backup_chain()
+        path_to_dir_chain.mkdir(exist_ok=True)
+        self.tracker = ChangeTracker(path_to_file_dirty=path_to_dir_chain / 'dirty')
+        self.names = self.infix = self.phones = None
+        self.hooks = (self.journal, self.tracker)
+        if with_indexes:
+            self.__use_indexes(loaded[2])
+        self.operations = {
+                            'lookup': self.lookup,
+                            'prefix': self.prefix,
+                            'substring': self.substring,
+                            'add': self.add,
+                            'edit': self.edit,
+                            'delete': self.delete,
+                            'count': lambda request: len(self.contacts),
+                            'batch': lambda request: [self.handle(i) for i in request['requests']],
+                          }
+
+    def __use_indexes(self, indexes: tuple) -> None:
+        self.names, self.infix, self.phones, _ = indexes
+        self.hooks = (*indexes, self.journal, self.tracker)
+
+    def build_indexes(self) -> None:
+        if self.names is None:
+            self.__use_indexes(create_indexes(dict_contacts=self.contacts))
+
+    @classmethod
+    def contact_to_json(cls, contact: Contact) -> dict:
+        return contact.dict[contact.phone_number]
+
+    def lookup(self, request: dict):
+        contact = self.contacts.get(request['phone'])
+        return None if contact is None else self.contact_to_json(contact)
+
+    def prefix(self, request: dict) -> list:
+        self.build_indexes()
+        if 'phone' in request:
+            phones = self.phones.find(request['phone'])
+        else:
+            phones = self.names.find(request['name'])
+        return [self.contact_to_json(self.contacts[i]) for i in phones[:request.get('limit')]]
+
+    def substring(self, request: dict) -> list:
+        self.build_indexes()
+        return [self.contact_to_json(contact)
+                for contact in iter_contact_by_name(dict_contacts=self.contacts,
+                                                    contact_name=request['name'],
+                                                    infix_index=self.infix,
+                                                    limit=request.get('limit'))]
+
+    def __new_contact(self, request: dict) -> Contact:
+        report = validate_contacts(rows=((request.get('phone'), request.get('name')),))
+        if report.invalid:
+            raise ValueError(report.summary())
+        return Contact(phone_number=request['phone'],
+                       contact_name=request['name'],
+                       date_time_creation_contact=datetime.datetime.now().replace(microsecond=0),
+                       validate=False)
+
+    def add(self, request: dict) -> dict:
+        contact = self.__new_contact(request)
+        if contact.phone_number in self.contacts:
+            raise ValueError('contact exists')
+        add_contact(dict_contacts=self.contacts, contact=contact, hooks=self.hooks)
+        return self.contact_to_json(contact)
+
+    def edit(self, request: dict) -> dict:
+        contact = self.contacts[request['phone']]
+        new_contact = self.__new_contact(request)
+        replace_contact(dict_contacts=self.contacts, contact=contact, new_contact=new_contact, hooks=self.hooks)
+        return self.contact_to_json(new_contact)
+
+    def delete(self, request: dict) -> bool:
+        remove_contact(dict_contacts=self.contacts, contact=self.contacts[request['phone']], hooks=self.hooks)
+        return True
+
+    def handle(self, request: dict) -> dict:
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': 'request is not object'}
+
+        request_id = request.get('id')
+        operation = self.operations.get(request.get('op'))
+        if operation is None:
+            return {'id': request_id, 'ok': False, 'error': f'unknown op: {request.get("op")!r}'}
+
+        for field in ('phone', 'name'):
+            if field in request and not isinstance(request[field], str):
+                return {'id': request_id, 'ok': False, 'error': f'{field} is not string'}
+
+        try:
+            result = operation(request)
+        except KeyError as error:
+            return {'id': request_id, 'ok': False, 'error': f'not found: {error}'}
+        except (ValueError, TypeError) as error:
+            return {'id': request_id, 'ok': False, 'error': str(error)}
+        except Exception as error:  # error of one request must not break pipeline of connection
+            return {'id': request_id, 'ok': False, 'error': f'{type(error).__name__}: {error}'}
+        return {'id': request_id, 'ok': True, 'result': result}
+
+    async def serve_connection(self, reader, writer) -> None:
+        encoder = json.JSONEncoder(separators=(',', ':'))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
                     break
+                try:
+                    response = self.handle(json.loads(line))
+                except json.JSONDecodeError as error:
+                    response = {'id': None, 'ok': False, 'error': f'not valid json: {error}'}
+
+                writer.write(f'{encoder.encode(response)}\n'.encode())
+                # pipelined requests are answered without waiting of transport, while it isn't full
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path_to_socket=None, host: str = '127.0.0.1', port: int = None) -> None:
+        import asyncio
+
+        if path_to_socket is not None:
+            server = await asyncio.start_unix_server(self.serve_connection, path=path_to_socket, limit=1 << 24)
+        else:
+            server = await asyncio.start_server(self.serve_connection, host=host, port=port, limit=1 << 24)
+
+        print(f'contact book ({len(self.contacts)} contacts) is served on '
+              f'{path_to_socket or ":".join(map(str, server.sockets[0].getsockname()[:2]))}')
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        compact_journal(dbase_dict=self.contacts, path_to_file_dbase=self.path_to_file_dbase, journal=self.journal,
+                        force=True)
+        self.journal.close()
+        self.tracker.close()
+
+
+def run_server(path_to_file_dbase=None, path_to_socket=None, host: str = '127.0.0.1', port: int = None) -> None:
+    """serve contact book up to Ctrl+C, changes are in journal (it is folded on exit, if it is big)"""
+    import asyncio
+
+    if path_to_socket is None and port is None:
+        port = get_tuning_value('server_port')
+
+    server = ContactBookServer(path_to_file_dbase=path_to_file_dbase)
+    try:
+        asyncio.run(server.serve(path_to_socket=path_to_socket, host=host, port=port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+async def query_server(requests: list, path_to_socket=None, host: str = '127.0.0.1', port: int = None) -> list:
+    """send requests to server at once (pipelining) and return responses in the same order"""
+    import asyncio
+
+    if path_to_socket is not None:
+        reader, writer = await asyncio.open_unix_connection(path=path_to_socket, limit=1 << 24)
+    else:
+        reader, writer = await asyncio.open_connection(host=host, port=port or get_tuning_value('server_port'),
+                                                       limit=1 << 24)
+    try:
+        writer.write(''.join(f'{json.dumps(request)}\n' for request in requests).encode())
+        await writer.drain()
+        return [json.loads(await reader.readline()) for _ in requests]
+    finally:
+        writer.close()
+
+
+def main():
+    import pickle
+
+    welcome_text = get_tuning_value('welcome_text')  # it's tuning
+
+    menu_text = ('Select on action (enter number) and press key Enter:',
+                 '1. Add contact',
+                 '2. Find contact',
+                 '3. Show all contacts',
+                 '4. Remove contact',
+                 '5. Edit contact',
+                 '6. Backup contact book (json)',
+                 '7. Save contact book to disk',
+                 '8. Exit',
+                 '9. Backup contact book (pickle)',
+                 '10. Backup contact book (ndjson)',
+                 '11. Restore contact book from backup',
+                 '12. Incremental backup contact book',
+                 '13. Backup contact book (compressed)',
+                 '14. Show metrics',
+                 '15. Import contacts (csv, vCard)')
+
+    menu_text = '\n'.join(menu_text)
+
+    print(welcome_text)
+
+    metrics = MetricsRegistry.get()
+    if get_tuning_value('metrics_file'):
+        metrics.dump_at_exit(path_to_file_metrics=get_tuning_value('metrics_file'))
+
+    contacts, cur_path_to_file_dbase, (names, infix, phones, order) = full_download_dbase(with_indexes=True)
+
+    assert cur_path_to_file_dbase  # check file db
+
+    journal = Journal(path_to_file_journal=get_path_to_file_journal(path_to_file_dbase=cur_path_to_file_dbase))
+    path_to_dir_chain = get_path_to_dir_backup_chain()
+    path_to_dir_chain.mkdir(exist_ok=True)
+    tracker = ChangeTracker(path_to_file_dirty=path_to_dir_chain / 'dirty')
+    metrics.set_gauge('contacts', lambda: len(contacts))
+    hooks = (names, infix, phones, order, journal, tracker)
+
+    contacts_change = False
+    contacts_rewrite = False  # contact book is replaced (restore), journal isn't enough for save
+
+    try:
+        while True:
+
+            print(menu_text)  # main menu
 
-                if action == 7:
+            try:
+                action = int(input('Select action and press the key Enter>> '))
+                if action not in (range(1, len(menu_text))):
+                    raise UnknownAction
+
+                if action == 8:
                     if contacts_change:
-                        full_upload_dbase(dbase_dict=contacts,
-                                          path_to_file_dbase=cur_path_to_file_dbase
-                                          )
-                        contacts_change = False
-                    else:
-                        print('There were no changes!')
+                        if not input('You have made changes. Save to disk? '
+                                     '("Y" - Press any key / "N" - exit without saving)>> ').upper() == 'N':
+                            compact_journal(dbase_dict=contacts,
+                                            path_to_file_dbase=cur_path_to_file_dbase,
+                                            journal=journal,
+                                            force=True,
+                                            rewrite=contacts_rewrite)
+                            journal.mark()
+                    break
+
+                while True:
+                    if action == 1:
+                        try:
+                            contact = create_contact()
+
+                            find_contact = find_contact_by_phone(dict_contacts=contacts,
+                                                                 phone_number=contact.phone_number)
+
+                            if find_contact is None:
+                                add_contact(dict_contacts=contacts, contact=contact, hooks=hooks)
+                                contacts_change = True
+                                raise ExitInMainMenu
+                            else:
+                                raise ContactExistInFileDBase
+
+                        except (NoneContactName, NoVerifiedPhoneNumber, ExitInMainMenu):
+                            if input('Add another? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                break
+                        except ContactExistInFileDBase:
+                            del contact
+                            if input(f'Contact exist!'
+                                     f'Repeat another? ("Y" - Press any key / "N" - return main menu)>> '
+                                     ).upper() == 'N':
+                                break
+
+                    if action == 2:
+                        try:
+                            search_type = int(input('1 - find by phone, 2 - find by contact name, '
+                                                    '3 - find by beginning of phone>> '))
+
+                            if search_type not in range(1, 4):
+                                raise UnknownAction
+
+                            if search_type == 1:
+                                    contact = (find_contact_by_phone(dict_contacts=contacts,
+                                                                     phone_number=input('Enter phone for search>> ')),)
+                            elif search_type == 2:
+                                    contact = find_contact_by_name_(names_dict=names,
+                                                                    dict_contacts=contacts,
+                                                                    contact_name=input('Enter name for search>> '),
+                                                                    infix_index=infix)
+                            elif search_type == 3:
+                                    contact = find_contact_by_phone_prefix(dict_contacts=contacts,
+                                                                           phone_index=phones,
+                                                                           phone_number=input('Enter beginning of phone '
+                                                                                              'for search>> '))
+                            else:
+                                    contact = None
+
+                            if contact is None:
+                                raise ContactNotFound
+                            else:
+                                contact = {i.phone_number: i for i in contact}
+                                print_contacts(contact)
+
+                                if input('Repeat find? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                    break
+                        except ContactNotFound:
+                            if input('Sorry, contact is not found. Repeat?'
+                                     '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                break
+
+                        except (UnknownAction, ValueError):
+                            if input('Sorry, you select unknown action. Repeat?'
+                                     '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                break
+
+                    if action == 3:
+                        print_contacts(contacts, order_index=order)
+                        break
+
+                    if action == 4:
+                        try:
+                            contact = find_contact_by_phone(dict_contacts=contacts,
+                                                            phone_number=input('Enter phone number for remove>> '))
+                            if contact is None:
+                                raise ContactNotFound
+                            else:
+                                print(f'This contact {str(contact)} will be deleted!')
+                                remove_contact(dict_contacts=contacts, contact=contact, hooks=hooks)
+                                contacts_change = True
+                                if input('Repeat remove? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                    break
+                        except ContactNotFound:
+                            if input('Sorry, contact not found. Repeat?'
+                                     '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                break
+
+                    if action == 5:
+                        try:
+                            contact = find_contact_by_phone(dict_contacts=contacts,
+                                                            phone_number=input('Enter phone number for edit>> '))
+                            if contact is None:
+                                raise ContactNotFound
+                            else:
+                                replace_contact(dict_contacts=contacts,
+                                                contact=contact,
+                                                new_contact=edit_contact(contact=contact),
+                                                hooks=hooks)
+                                contacts_change = True
+
+                                if input('Repeat edit? ("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                    break
+
+                        except ContactNotFound:
+                            if input('Sorry, contact not found. Repeat?'
+                                     '("Y" - Press any key / "N" - return main menu)>> ').upper() == 'N':
+                                break
 
-                    input('Press any key to continue...')
+                    if action in (6, 9, 10, 13):
+                        format_of_backup = {
+                                              6:'json',
+                                              9:'pickle',
+                                              10:'ndjson',
+                                              13:get_tuning_value('format_of_compressed_backup')
+                                            }
+                        path_to_file = full_backup_dbase(
+                                                          dbase_dict=contacts,
+                                                          format_of_backup=format_of_backup.get(action)
+                                                         )
+                        input(f'Backup done... create file: {path_to_file}')
+                        break
+
+                    if action == 7:
+                        if contacts_change:
+                            # changes are in journal already, file dbase is rewritten only for big journal
+                            compact_journal(dbase_dict=contacts,
+                                            path_to_file_dbase=cur_path_to_file_dbase,
+                                            journal=journal,
+                                            rewrite=contacts_rewrite)
+                            journal.mark()
+                            contacts_change = False
+                            contacts_rewrite = False
+                        else:
+                            print('There were no changes!')
+
+                        input('Press any key to continue...')
+                        break
+
+                    if action == 11:
+                        path_to_file = input('Enter path to file of backup (json, ndjson, pickle, also .gz, .bz2, .xz) '
+                                             'or directory of chain of backups>> ')
+                        try:
+                            if os.path.isdir(path_to_file):
+                                restored_contacts, _ = restore_backup_chain(path_to_dir_chain=path_to_file)
+                            else:
+                                restored_contacts, _ = full_restore_dbase(path_to_file_backup=path_to_file)
+                        except FileBaseNotFound:
+                            print(f'File {path_to_file} not found!')
+                        except UnknownFormatOfBackupError:
+                            pass
+                        except (json.JSONDecodeError, pickle.UnpicklingError, UnicodeDecodeError):
+                            print(f'File {path_to_file} is not valid backup!')
+                        else:
+                            contacts = restored_contacts
+                            names, infix, phones, order = create_indexes(dict_contacts=contacts)
+                            hooks = (names, infix, phones, order, journal, tracker)
+                            tracker.require_full()
+                            contacts_change = True
+                            contacts_rewrite = True
+
+                        input('Press any key to continue...')
+                        break
+
+                    if action == 15:
+                        path_to_file = input('Enter path to file for import (csv, vcf)>> ')
+                        cnt_contacts = len(contacts)
+                        try:
+                            import_contacts(dbase_dict=contacts, path_to_file_import=path_to_file, hooks=hooks)
+                        except FileBaseNotFound:
+                            print(f'File {path_to_file} not found!')
+                        except (UnknownFormatOfBackupError, UnicodeDecodeError):
+                            print(f'File {path_to_file} is not csv or vCard!')
+                        # contacts before error in file are imported also
+                        contacts_change = contacts_change or len(contacts) > cnt_contacts
+
+                        input('Press any key to continue...')
+                        break
+
+                    if action == 14:
+                        if not metrics.enabled:
+                            print('Metrics are disabled (tuning metrics_enabled)')
+                        print(metrics.dump_json())
+                        input('Press any key to continue...')
+                        break
+
+                    if action == 12:
+                        path_to_file = incremental_backup_dbase(dbase_dict=contacts,
+                                                                tracker=tracker,
+                                                                path_to_dir_chain=path_to_dir_chain)
+                        input(f'Backup done... create file: {path_to_file}')
+                        break
+
+            except (UnknownAction, ValueError):
+                if input('Sorry, you select unknown action. Repeat?'
+                         '("Y" - Press any key / "N" - exit)>> ').upper() == 'N':
                     break
+    finally:
+        # changes after last save are dropped on any exit without saving (also Ctrl+C),
+        # saved changes of journal go to file dbase
+        journal.rollback()
+        compact_journal(dbase_dict=contacts,
+                        path_to_file_dbase=cur_path_to_file_dbase,
+                        journal=journal,
+                        force=True)
+        journal.close()
+        tracker.close()
 
-        except (UnknownAction, ValueError):
-            if input('Sorry, you select unknown action. Repeat?'
-                     '("Y" - Press any key / "N" - exit)>> ').upper() == 'N':
-                break
+
+def get_cli_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='contact_book',
+                                     description='contact book (without command - interactive menu)')
+    parser.add_argument('--dbase', help='file dbase (default ~/contact_book/contact-book.dbase)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    find = commands.add_parser('find', help='search contacts, found contacts are printed as json lines')
+    what = find.add_mutually_exclusive_group(required=True)
+    what.add_argument('--prefix', help='prefix of name')
+    what.add_argument('--phone', help='prefix of phone number')
+    what.add_argument('--substring', help='part of name')
+    find.add_argument('--limit', type=int)
+
+    add = commands.add_parser('add', help='add contact')
+    add.add_argument('phone')
+    add.add_argument('name')
+
+    import_ = commands.add_parser('import', help='bulk import from csv or vCard')
+    import_.add_argument('file')
+    import_.add_argument('--format', choices=sorted(get_import_formats()))
+
+    export = commands.add_parser('export', help='write contact book to file, format by extension (json, ndjson.gz...)')
+    export.add_argument('file')
+
+    backup = commands.add_parser('backup', help='backup to directory of contact book')
+    backup.add_argument('--format', default='json', help='format of full backup (json, ndjson.gz, pickle.xz...)')
+    backup.add_argument('--incremental', action='store_true', help='delta of backup chain')
+
+    commands.add_parser('stats', help='size of contact book, files and load time')
+
+    commands.add_parser('batch', help='requests from stdin (json lines, as for server), responses to stdout')
+
+    serve = commands.add_parser('serve', help='asyncio server of contact book')
+    serve.add_argument('--socket', help='path to unix socket (default - localhost tcp)')
+    serve.add_argument('--port', type=int)
+    return parser
+
+
+def cli(argv: list = None) -> int:
+    """Non-interactive commands of contact book. Messages of loading and saving go to stderr,
+    stdout has results only (json lines), so output is ready for pipes. Exit code 1 - request failed"""
+    import sys
+
+    args = get_cli_parser().parse_args(argv)
+
+    if args.command == 'serve':
+        run_server(path_to_file_dbase=args.dbase, path_to_socket=args.socket, port=args.port)
+        return 0
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        service = ContactBookServer(path_to_file_dbase=args.dbase, with_indexes=args.command in ('find', 'batch'))
+    load_seconds = time.perf_counter() - start
+
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    write = sys.stdout.write
+    failed = 0
+
+    try:
+        if args.command == 'batch':
+            for line in sys.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    response = service.handle(json.loads(line))
+                except json.JSONDecodeError as error:
+                    response = {'id': None, 'ok': False, 'error': f'not valid json: {error}'}
+                failed += not response['ok']
+                write(f'{encoder.encode(response)}\n')
+
+        elif args.command in ('find', 'add'):
+            if args.command == 'add':
+                request = {'op': 'add', 'phone': args.phone, 'name': args.name}
+            elif args.substring is not None:
+                request = {'op': 'substring', 'name': args.substring, 'limit': args.limit}
+            elif args.phone is not None:
+                request = {'op': 'prefix', 'phone': args.phone, 'limit': args.limit}
+            else:
+                request = {'op': 'prefix', 'name': args.prefix, 'limit': args.limit}
+
+            response = service.handle(request)
+            if not response['ok']:
+                print(response['error'], file=sys.stderr)
+                failed += 1
+            else:
+                result = response['result']
+                for contact in (result if isinstance(result, list) else (result,)):
+                    write(f'{encoder.encode(contact)}\n')
+
+        else:
+            mark_print = get_tuning_value('import_mark_print')
+            with contextlib.redirect_stdout(sys.stderr):
+                if args.command == 'import':
+                    result = import_contacts(dbase_dict=service.contacts,
+                                             path_to_file_import=args.file,
+                                             format_of_import=args.format,
+                                             hooks=service.hooks)
+                elif args.command == 'export':
+                    result = str(full_backup_dbase(dbase_dict=service.contacts,
+                                                   format_of_backup=get_format_of_backup(args.file),
+                                                   path_to_file_dbase=args.file,
+                                                   mark_print=mark_print))
+                elif args.command == 'backup' and args.incremental:
+                    result = str(incremental_backup_dbase(dbase_dict=service.contacts, tracker=service.tracker))
+                elif args.command == 'backup':
+                    result = str(full_backup_dbase(dbase_dict=service.contacts,
+                                                   format_of_backup=args.format,
+                                                   mark_print=mark_print))
+                else:
+                    result = {'contacts': len(service.contacts),
+                              'path_to_file_dbase': str(service.path_to_file_dbase),
+                              'size_of_file_dbase': os.path.getsize(service.path_to_file_dbase),
+                              'size_of_journals': sum(os.path.getsize(path) for path in
+                                                      get_paths_to_files_journal(service.path_to_file_dbase)),
+                              'load_seconds': round(load_seconds, 6)}
+                    if get_tuning_value('metrics_enabled'):
+                        result['metrics'] = MetricsRegistry.get().snapshot()
+            write(f'{encoder.encode(result)}\n')
+
+    except (ExceptionContactBook, OSError, UnicodeDecodeError) as error:
+        print(str(error) or type(error).__name__, file=sys.stderr)
+        failed += 1
+
+    finally:
+        with contextlib.redirect_stdout(sys.stderr):
+            service.close()
+
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1:
+        raise SystemExit(cli())
+
     main()
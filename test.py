@@ -3,32 +3,22 @@ import random
 import string
 
 
-def create_dummy_contacts() -> tuple:
-    max_contacts: int = 100_000
+def create_dummy_contacts(max_contacts: int = 100_000, seed: int = None) -> tuple:
+    """dummy contacts and 10 of them for search, with seed the same contacts are created on every run"""
+    rnd = random.Random(seed)
     max_contacts_for_search = 10
-    contacts_index = (random.choice(range(max_contacts_for_search)) for i in range(max_contacts_for_search))
-
-    _ = tuple(Contact(phone_number=f'+{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                                   f'{random.choice(string.digits)}'
-                      , contact_name=((f'{random.choice(string.ascii_letters)}'
-                                       f'{random.choice(string.ascii_letters)}'
-                                       f'{random.choice(string.ascii_letters)}'
-                                       * 3) + str(i) + ' ' +
-                                      (f'{random.choice(string.ascii_letters)}'
-                                       f'{random.choice(string.ascii_letters)}'
-                                       f'{random.choice(string.ascii_letters)}'
-                                       * 3) + str(i)
-                                      )
-                      )
+    date_time_creation = datetime.datetime(2020, 1, 1) if seed is not None else datetime.datetime.now()
+
+    def dummy_name(i: int) -> str:
+        return ''.join(rnd.choices(string.ascii_letters, k=3)) * 3 + str(i)
+
+    _ = tuple(Contact(phone_number=f'+{rnd.randrange(10 ** 9):09d}',
+                      contact_name=f'{dummy_name(i)} {dummy_name(i)}',
+                      date_time_creation_contact=date_time_creation + datetime.timedelta(seconds=i % 86_400),
+                      validate=False)
               for i in range(max_contacts))
 
+    contacts_index = (rnd.randrange(len(_)) for i in range(min(max_contacts_for_search, len(_))))
     return {contact.phone_number: contact for contact in _}, {_[i].phone_number: _[i] for i in contacts_index}
 
 
@@ -80,17 +70,369 @@ def search_contact_in_dummy(names_dict_: dict, dict_contacts: dict, contacts_sea
     return result_search
 
 
-'contacts, path_to_file, contacts_search = create_dummy()'
-'names_dict = create_dummy_cash_names(dict_contacts=contacts)'
+def benchmark_durability(contacts_: dict, count_saves: int = 5, count_journal_records: int = 1_000) -> dict:
+    """cost of durability levels: full saves and journal records per second"""
+    import unittest.mock
+    import tempfile
+
+    result = {}
+    with tempfile.TemporaryDirectory() as path_to_dir:
+        path_to_file_dbase = pathlib.Path(path_to_dir) / 'contact-book.dbase'
+        contacts_journal = tuple(contacts_.values())[:count_journal_records]
+
+        for durability in ('always', 'batch', 'none'):
+            tuning = {'durability': durability}
+            get_tuning_value_ = get_tuning_value
+
+            with unittest.mock.patch('contact_book.get_tuning_value',
+                                     lambda name: tuning[name] if name in tuning else get_tuning_value_(name)):
+                time_start = datetime.datetime.now()
+                for _ in range(count_saves):
+                    full_upload_dbase(dbase_dict=contacts_,
+                                      path_to_file_dbase=path_to_file_dbase,
+                                      mark_print=len(contacts_))
+                time_saves = (datetime.datetime.now() - time_start).total_seconds()
+
+                journal = Journal(path_to_file_journal=get_path_to_file_journal(path_to_file_dbase))
+                time_start = datetime.datetime.now()
+                for contact in contacts_journal:
+                    journal.add(contact)
+                time_journal = (datetime.datetime.now() - time_start).total_seconds()
+                journal.clear()
+                journal.close()
+
+            result[durability] = {'rows_per_second_save': count_saves * len(contacts_) / time_saves,
+                                  'records_per_second_journal': len(contacts_journal) / time_journal}
+            print(durability, result[durability], sep=': ')
+
+    return result
+
+
+def benchmark_backup_formats(contacts_: dict = None, formats_of_backup: tuple = None) -> dict:
+    """throughput of backup and restore against size of file for every format of backup (1M contacts)"""
+    import tempfile
+
+    if contacts_ is None:
+        contacts_, _ = create_dummy_contacts(max_contacts=1_000_000)
+    if formats_of_backup is None:
+        formats_of_backup = tuple(get_backup_formats())
+
+    result = {}
+    with tempfile.TemporaryDirectory() as path_to_dir:
+        size_plain = {}
+        for format_of_backup in formats_of_backup:
+            extension_file = get_backup_formats()[format_of_backup][0]
+            path_to_file_backup = pathlib.Path(path_to_dir) / f'contact-book.{extension_file}'
+
+            time_start = datetime.datetime.now()
+            full_backup_dbase(dbase_dict=contacts_,
+                              format_of_backup=format_of_backup,
+                              path_to_file_dbase=path_to_file_backup,
+                              mark_print=len(contacts_))
+            time_backup = (datetime.datetime.now() - time_start).total_seconds()
+
+            time_start = datetime.datetime.now()
+            full_restore_dbase(path_to_file_backup=path_to_file_backup,
+                               mark_print=len(contacts_))
+            time_restore = (datetime.datetime.now() - time_start).total_seconds()
+
+            size = os.path.getsize(path_to_file_backup)
+            size_plain.setdefault(format_of_backup.split('.')[0], size)
+            os.remove(path_to_file_backup)
+
+            result[format_of_backup] = {'size': size,
+                                        'ratio': size_plain[format_of_backup.split('.')[0]] / size,
+                                        'rows_per_second_backup': len(contacts_) / time_backup,
+                                        'rows_per_second_restore': len(contacts_) / time_restore}
+            print(format_of_backup, result[format_of_backup], sep=': ')
+
+    return result
+
+
+def concurrency_worker(path_to_file_dbase, num_process: int, count_ops: int, read_ratio: float, queue_result) -> None:
+    """mixed reads and writes of shared file dbase: writes are apply (merge under lock)
+    and write with version (retry on conflict)"""
+    import contextlib
+    import io
+    import time
+
+    rnd = random.Random(num_process)
+    shared = SharedDbase(path_to_file_dbase=path_to_file_dbase)
+    result = {'reads': 0, 'writes': 0, 'conflicts': 0, 'phones': []}
+
+    time_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(count_ops):
+            if rnd.random() < read_ratio:
+                contacts, _ = shared.read()
+                contacts.get(f'+{rnd.randrange(10 ** 9):09d}')
+                result['reads'] += 1
+                continue
+
+            contact = Contact(phone_number=f'+8{num_process:03d}{i:06d}', contact_name=f'worker {num_process} {i}')
+            if i % 2:
+                shared.apply(put=[contact])
+            else:
+                while True:
+                    contacts, version = shared.read()
+                    contacts[contact.phone_number] = contact
+                    try:
+                        shared.write(contacts=contacts, version=version)
+                        break
+                    except VersionConflict:
+                        result['conflicts'] += 1
+            result['writes'] += 1
+            result['phones'].append(contact.phone_number)
+
+    result['seconds'] = time.perf_counter() - time_start
+    queue_result.put(result)
+
+
+def benchmark_concurrency(processes: int = 4, count_ops: int = 100, max_contacts: int = 10_000,
+                          read_ratio: float = 0.8, seed: int = 1) -> dict:
+    """stress of shared file dbase by N processes: operations per second, conflicts, lost writes"""
+    import multiprocessing
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as path_to_dir:
+        path_to_file_dbase = pathlib.Path(path_to_dir) / 'contact-book.dbase'
+        contacts_, _ = create_dummy_contacts(max_contacts=max_contacts, seed=seed)
+        full_upload_dbase(dbase_dict=contacts_, path_to_file_dbase=path_to_file_dbase, version=0)
+
+        queue_result = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=concurrency_worker,
+                                           args=(path_to_file_dbase, num, count_ops, read_ratio, queue_result))
+                   for num in range(processes)]
+        for worker in workers:
+            worker.start()
+        results = [queue_result.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        contacts_, version = SharedDbase(path_to_file_dbase=path_to_file_dbase).read()
+        phones = [phone_number for result in results for phone_number in result['phones']]
+
+    result = {'processes': processes,
+              'ops_per_second': sum(r['reads'] + r['writes'] for r in results) / max(r['seconds'] for r in results),
+              'reads': sum(r['reads'] for r in results),
+              'writes': sum(r['writes'] for r in results),
+              'conflicts': sum(r['conflicts'] for r in results),
+              'lost_writes': sum(phone_number not in contacts_ for phone_number in phones),
+              'version': version}
+    print(json.dumps(result, indent=4))
+    return result
+
+
+async def server_load_connection(reader, writer, requests: list, pipeline: int) -> list:
+    """keep up to pipeline requests in flight on connection, return latencies (seconds)"""
+    import collections
+
+    latencies = []
+    sent = collections.deque()
+    requests = iter(requests)
+
+    def send(count: int) -> None:
+        lines = []
+        for request in itertools.islice(requests, count):
+            lines.append(f'{json.dumps(request)}\n')
+            sent.append(time.perf_counter())
+        writer.write(''.join(lines).encode())
+
+    send(pipeline)
+    while sent:
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent.popleft())
+        if not response['ok'] and response['error'] != 'contact exists':
+            raise RuntimeError(response['error'])
+        send(1)
+    writer.close()
+    return latencies
+
+
+async def benchmark_server_async(path_to_socket=None, port: int = None, connections: int = 4, pipeline: int = 16,
+                                 count_requests: int = 10_000, write_ratio: float = 0.05, seed: int = 1) -> dict:
+    import asyncio
+
+    async def connect():
+        if path_to_socket is not None:
+            return await asyncio.open_unix_connection(path=path_to_socket, limit=1 << 24)
+        return await asyncio.open_connection(host='127.0.0.1', port=port, limit=1 << 24)
+
+    sample, = await query_server([{'op': 'prefix', 'phone': '', 'limit': 10_000}],
+                                 path_to_socket=path_to_socket, port=port)
+    phones = [contact['phone_number'] for contact in sample['result']]
+    names = [contact['contact_name'] for contact in sample['result']]
+    if not phones:
+        raise RuntimeError('contact book of server is empty')
+
+    random.seed(seed)
+    reads = (lambda: {'op': 'lookup', 'phone': random.choice(phones)},
+             lambda: {'op': 'prefix', 'name': random.choice(names)[:3], 'limit': 10},
+             lambda: {'op': 'substring', 'name': random.choice(names)[1:4], 'limit': 10})
+    requests = [[({'op': 'add', 'phone': f'+9{random.randrange(10 ** 10)}', 'name': 'load generator'}
+                  if random.random() < write_ratio else random.choice(reads)())
+                 for _ in range(count_requests // connections)]
+                for _ in range(connections)]
+
+    streams = [await connect() for _ in range(connections)]
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(server_load_connection(reader, writer, requests_, pipeline)
+                                       for (reader, writer), requests_ in zip(streams, requests)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(itertools.chain.from_iterable(latencies))
+    return {'connections': connections,
+            'pipeline': pipeline,
+            'requests': len(latencies),
+            'requests_per_second': len(latencies) / seconds,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000}
+
+
+def benchmark_server(path_to_socket=None, port: int = None, **kwargs) -> dict:
+    """load generator for server of contact book (python contact_book.py serve ...): requests per second,
+    p50/p99 latency"""
+    import asyncio
+
+    result = asyncio.run(benchmark_server_async(path_to_socket=path_to_socket, port=port, **kwargs))
+    print(json.dumps(result, indent=4))
+    return result
+
+
+def parse_size(size: str) -> int:
+    """10k, 1M -> 10000, 1000000"""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    size = size.strip().lower()
+    if size[-1] in multipliers:
+        return int(float(size[:-1]) * multipliers[size[-1]])
+    return int(size)
+
+
+def benchmark_size(max_contacts: int, seed: int = 1, count_searches: int = 1_000) -> dict:
+    """seconds of load, save, backup and index build, microseconds of one search, peak of memory of load (Mb)"""
+    import tempfile
+    import time
+    import tracemalloc
+    import unittest.mock
+
+    contacts_, _ = create_dummy_contacts(max_contacts=max_contacts, seed=seed)
+    rnd = random.Random(seed)
+    contacts_search_ = [contacts_[phone_number]
+                        for phone_number in rnd.sample(tuple(contacts_), min(count_searches, len(contacts_)))]
+
+    result = {}
+    # snapshot would hide parsing of file dbase, journal isn't used
+    tuning = {'dbase_snapshot': False, 'contact_store': 'dict'}
+    get_tuning_value_ = get_tuning_value
+
+    with tempfile.TemporaryDirectory() as path_to_dir, \
+            unittest.mock.patch('contact_book.get_tuning_value',
+                                lambda name: tuning[name] if name in tuning else get_tuning_value_(name)):
+        path_to_file_dbase = pathlib.Path(path_to_dir) / 'contact-book.dbase'
+
+        time_start = time.perf_counter()
+        full_upload_dbase(dbase_dict=contacts_, path_to_file_dbase=path_to_file_dbase, mark_print=max_contacts)
+        result['save_s'] = time.perf_counter() - time_start
+
+        time_start = time.perf_counter()
+        full_backup_dbase(dbase_dict=contacts_,
+                          format_of_backup='ndjson',
+                          path_to_file_dbase=pathlib.Path(path_to_dir) / 'contact-book.ndjson',
+                          mark_print=max_contacts)
+        result['backup_s'] = time.perf_counter() - time_start
+
+        del contacts_
+        time_start = time.perf_counter()
+        contacts_, _ = full_download_dbase(path_to_file_dbase=path_to_file_dbase,
+                                           mark_print=max_contacts,
+                                           replay_journal=False)
+        result['load_s'] = time.perf_counter() - time_start
+
+        time_start = time.perf_counter()
+        names, infix, phones, order = create_indexes(dict_contacts=contacts_)
+        result['index_build_s'] = time.perf_counter() - time_start
+
+        searches = {
+                     'search_prefix_us': lambda contact: names.find(contact.contact_name[:4]),
+                     'search_substring_us': lambda contact: find_contact_by_name(dict_contacts=contacts_,
+                                                                                 contact_name=contact.contact_name[4:9],
+                                                                                 infix_index=infix),
+                     'search_phone_us': lambda contact: find_contact_by_phone(dict_contacts=contacts_,
+                                                                              phone_number=contact.phone_number),
+                     'search_phone_prefix_us': lambda contact: phones.find(contact.phone_number[:5]),
+                   }
+        for name, search in searches.items():
+            time_start = time.perf_counter()
+            for contact in contacts_search_:
+                search(contact)
+            result[name] = (time.perf_counter() - time_start) * 1e6 / len(contacts_search_)
+
+        del contacts_, names, infix, phones, order
+        tracemalloc.start()
+        contacts_, _ = full_download_dbase(path_to_file_dbase=path_to_file_dbase,
+                                           mark_print=max_contacts,
+                                           replay_journal=False)
+        result['memory_peak_load_mb'] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        tracemalloc.stop()
+
+    return result
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    """regressions: metrics, which are bigger than baseline more than tolerance"""
+    regressions = []
+    for size, metrics in results.items():
+        for name, value in metrics.items():
+            value_baseline = baseline.get(size, {}).get(name)
+            if value_baseline is not None and value > value_baseline * (1 + tolerance):
+                regressions.append(f'{size} {name}: {value:.3f} > {value_baseline:.3f} (+{tolerance:.0%})')
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark of contact book')
+    parser.add_argument('--sizes', default='10k,100k,1M', help='sizes of contact book: 10k,100k,1M,10M')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--searches', type=int, default=1_000, help='count of searches of every type')
+    parser.add_argument('--results', default='benchmark.json', help='file for results (json)')
+    parser.add_argument('--baseline', help='results of previous run (json), regression fails run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression against baseline')
+    parser.add_argument('--processes', type=int, default=0, help='stress of shared file dbase by N processes')
+    parser.add_argument('--server', help='load of running server: path to unix socket or localhost port')
+    parser.add_argument('--connections', type=int, default=4, help='connections of load of server')
+    parser.add_argument('--pipeline', type=int, default=16, help='requests in flight on connection of server')
+    args = parser.parse_args()
+
+    if args.server:
+        address = dict(port=int(args.server)) if args.server.isdigit() else dict(path_to_socket=args.server)
+        benchmark_server(connections=args.connections, pipeline=args.pipeline,
+                         count_requests=args.searches * 10, seed=args.seed, **address)
+        return 0
+
+    if args.processes:
+        result = benchmark_concurrency(processes=args.processes, seed=args.seed)
+        return 1 if result['lost_writes'] else 0
+
+    results = {}
+    for size in args.sizes.split(','):
+        results[size] = benchmark_size(max_contacts=parse_size(size), seed=args.seed, count_searches=args.searches)
+        print(size, json.dumps(results[size], indent=4), sep=': ')
+
+    with open(args.results, 'w') as fr:
+        json.dump(results, fr, indent=4)
 
-'''search_contact = search_contact_in_dummy(names_dict_=names_dict,
-                                         dict_contacts=contacts,
-                                         contacts_search_=contacts_search
-                                         )'''
+    if args.baseline:
+        with open(args.baseline, 'r') as fb:
+            regressions = compare_with_baseline(results=results, baseline=json.load(fb), tolerance=args.tolerance)
+        if regressions:
+            print('regressions against baseline:', *regressions, sep='\n')
+            return 1
 
-a = Contact(phone_number='+7925', contact_name='george')
-b = create_cash_names(a.dict_with_object)
+    return 0
 
-f = {i.contact_name[:j].upper():i for i in a.dict_with_object.values() for j in range(1, len(i.contact_name)+1)}
 
-help(a.mask_date_time_creation)
\ No newline at end of file
+if __name__ == '__main__':
+    raise SystemExit(main())